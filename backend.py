@@ -1,141 +1,392 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, File, Form, Query, UploadFile, WebSocket, WebSocketDisconnect, Request, Response
+from fastapi.requests import HTTPConnection
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import speech_recognition as sr
 import os
-from datetime import datetime
-from zoneinfo import ZoneInfo
 import uvicorn
-from typing import Optional
-import tempfile
-from pydub import AudioSegment
+from typing import List, Optional
+from datetime import datetime, timezone
+import time
+import json
+import asyncio
+import io
+import zipfile
+from collections import deque
+from transcription import TranscriptionExecutor, TranscriptionBusy, StageTimer, StreamingDecoder, transcribe_audio
+from speech_engine import get_engine
+from note_store import NoteStore
+from events import EventBroker
+from llm_gateway import LLMGateway, LLMBusy, OLLAMA_HOST
+from summary_cache import SummaryCache
+from search_index import SearchIndex, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+from recall import RecallIndex, RECALL_TOP_K
 import ollama
-
-# Configure Ollama client to use host from environment variable
-OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
-ollama_client = ollama.Client(host=OLLAMA_HOST)
+from intents import classify
+from sessions import (SessionRegistry, SessionState, InvalidUser, DEFAULT_USER, NOTES_HISTORY_SIZE,
+                      resolve_user, user_notes_dir)
+from metrics import REGISTRY, CONTENT_TYPE, Gauge, Histogram, observe_timings, record_error, track
+
+# Async Ollama access (host comes from OLLAMA_HOST)
+llm = LLMGateway()
+SUMMARY_MODEL = 'llama3.2'
+
+# Page sizes for the notes history API
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '30'))
+NOTES_PAGE_SIZE = int(os.getenv('NOTES_PAGE_SIZE', '50'))
+
+# Range summaries: days summarized at once, summaries merged per reduce
+# step, and the longest range accepted
+SUMMARY_PARALLEL = int(os.getenv('SUMMARY_PARALLEL', '4'))
+SUMMARY_FAN_IN = int(os.getenv('SUMMARY_FAN_IN', '7'))
+SUMMARY_MAX_DAYS = int(os.getenv('SUMMARY_MAX_DAYS', '366'))
+
+# Note embeddings are computed on background threads, so they use a plain client
+embed_client = ollama.Client(host=OLLAMA_HOST)
+
+# Where notes are kept (shared with listeny.py and web_app.py by default);
+# other users get their own shard under notes/users/<id>/
+NOTES_DIR = os.getenv('NOTES_DIR', os.path.join(os.path.dirname(__file__), 'notes'))
+
+# Most clips accepted by one /api/upload-audio/batch request (archives are counted by
+# member), and the most audio in megabytes once archives are uncompressed
+BATCH_MAX_CLIPS = int(os.getenv('BATCH_MAX_CLIPS', '100'))
+BATCH_MAX_MB = int(os.getenv('BATCH_MAX_MB', '200'))
+
+REQUEST_SECONDS = Histogram('listeny_http_request_seconds', 'HTTP request time until the response starts', ['method', 'route', 'status'])
+REQUESTS_IN_FLIGHT = Gauge('listeny_http_requests_in_flight', 'HTTP requests being handled')
+TRANSCRIBE_QUEUE = Gauge('listeny_transcription_jobs', 'Transcription jobs in the worker pool', ['state'])
+LLM_QUEUE = Gauge('listeny_llm_requests', 'Ollama requests through the gateway', ['model', 'state'])
 
 class NoteRequest(BaseModel):
     text: Optional[str] = None
     action: str
 
 class ListenyAPI:
-    def __init__(self):
+    """One user's notes, mode and event stream. The worker pool is shared by everyone."""
+
+    def __init__(self, user_id=DEFAULT_USER, notes_dir=NOTES_DIR, executor=None):
         # Initialize components
-        self.recognizer = sr.Recognizer()
+        self.user_id = user_id
+        self.executor = executor or TranscriptionExecutor()
+        self.events = EventBroker()
 
         # Notes directory
-        self.notes_dir = os.path.join(os.path.dirname(__file__), 'notes')
+        self.notes_dir = notes_dir
         os.makedirs(self.notes_dir, exist_ok=True)
+        self.store = NoteStore(self.notes_dir, heading="Daily Notes")
+
+        # Rendered markdown per day, keyed on the log's (size, mtime)
+        self.notes_cache = {}
+        self.summaries = SummaryCache(os.path.join(self.notes_dir, '.cache', 'summaries.json'))
+        self.search = SearchIndex(self.store, os.path.join(self.notes_dir, '.cache', 'search.db'))
+        self.recall = RecallIndex(self.store, os.path.join(self.notes_dir, '.cache', 'embeddings'), embed_client)
+
+        # Session data - recent notes are capped, and the mode is kept on
+        # disk so every worker process serving this user agrees on it
+        self.notes_history = deque(maxlen=NOTES_HISTORY_SIZE)
+        self.notes_saved = 0
+        self.state = SessionState(os.path.join(self.notes_dir, '.session.json'), {'note_mode': True})
+
+    @property
+    def note_mode(self):
+        return self.state.get('note_mode')
+
+    def close(self):
+        self.store.close()
+        self.search.close()
+        self.recall.close()
+
+    def index_notes(self, entries):
+        # The note is already saved; an index failure shouldn't undo that
+        self.recall.add(entries)
+        try:
+            self.search.add(entries)
+        except Exception as e:
+            record_error('search_index', e)
+            print(f"Search index update failed: {e}")
+
+    async def save_note(self, note_content):
+        """Save note to today's markdown file.
 
-        # Session data
-        self.notes_history = []
-        self.note_mode = True
-
-    def is_note_command(self, text):
-        """Check if command is a note-taking request"""
-        note_triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        text_lower = text.lower()
-        return any(trigger in text_lower for trigger in note_triggers)
-
-    def extract_note(self, text):
-        """Extract the actual note content from the command"""
-        text_lower = text.lower()
-        triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        note = text
-        for trigger in triggers:
-            if trigger in text_lower:
-                idx = text_lower.find(trigger) + len(trigger)
-                note = text[idx:].strip()
-                for filler in ['that', 'to', ':', '-']:
-                    if note.lower().startswith(filler):
-                        note = note[len(filler):].strip()
-                break
-        return note if note else text
-
-    def save_note(self, note_content):
-        """Save note to today's markdown file"""
-        chicago_tz = ZoneInfo("America/Chicago")
-        today = datetime.now(chicago_tz)
-        filename = today.strftime('%Y-%m-%d') + '.md'
-        filepath = os.path.join(self.notes_dir, filename)
-
-        timestamp = today.strftime('%H:%M')
-
-        if os.path.exists(filepath):
-            with open(filepath, 'a') as f:
-                f.write(f"\n- **{timestamp}**: {note_content}")
-        else:
-            with open(filepath, 'w') as f:
-                f.write(f"# Notes for {today.strftime('%A, %B %d, %Y')}\n\n")
-                f.write(f"## Daily Notes\n\n")
-                f.write(f"- **{timestamp}**: {note_content}")
+        The commit is awaited, not waited on, so the event loop keeps taking
+        other requests and their notes join the same group commit.
+        """
+        entry = (await asyncio.wrap_future(self.store.submit([(note_content, None)])))[0]
+        self.index_notes([entry])
 
         # Add to history
         self.notes_history.append({
-            'time': timestamp,
+            'time': entry['time'],
             'content': note_content
         })
-
-        return filepath
+        self.notes_saved += 1
+        self.events.publish("note-saved", {**entry, "notes_count": self.notes_saved})
+
+        return self.store.markdown_path(entry['day'])
+
+    async def save_notes(self, items):
+        """Save several (content, when) notes in one grouped write"""
+        entries = await asyncio.wrap_future(self.store.submit(items))
+        self.index_notes(entries)
+        for entry in entries:
+            self.notes_history.append({
+                'time': entry['time'],
+                'content': entry['content']
+            })
+            self.notes_saved += 1
+            self.events.publish("note-saved", {**entry, "notes_count": self.notes_saved})
+        return entries
+
+    def notes_etag(self, day):
+        size, mtime = self.store.version(day)
+        return f'"{day}-{size}-{mtime}"'
+
+    def notes_markdown(self, day):
+        """Today's markdown, re-rendered only when the log has changed"""
+        etag = self.notes_etag(day)
+        cached = self.notes_cache.get(day)
+        if cached and cached[0] == etag:
+            return cached[1]
+
+        content = self.store.render_markdown(day)
+        # Rendering may have imported a legacy markdown file, so re-read the tag
+        self.notes_cache = {day: (self.notes_etag(day), content)}
+        return content
+
+    def set_mode(self, note_mode):
+        self.state.set('note_mode', note_mode)
+        self.events.publish("mode-changed", {"note_mode": note_mode})
+
+    def transcript_note(self, text):
+        """The note to save for recognized text under the current mode, or the error result"""
+        if self.note_mode:
+            # Note mode - save text directly
+            note_content = text.strip()
+            if note_content:
+                return note_content, None
+            return None, {"status": "error", "message": "Empty note"}
+
+        # Assistant mode - check for note commands
+        intent = classify(text)
+        if intent.kind == 'note':
+            return intent.payload, None
+        return None, {"status": "error", "message": f"Heard: '{text}' (not a note command)", "text": text}
+
+    async def handle_transcript(self, text):
+        """Save recognized text according to the current mode"""
+        note_content, error = self.transcript_note(text)
+        if error:
+            return error
+        filepath = await self.save_note(note_content)
+        return {"status": "noted", "message": "NOTED!", "text": text}
 
     async def process_audio(self, audio_file: UploadFile):
         """Process uploaded audio file"""
         try:
-            # Save uploaded file to temporary location
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp_webm:
+            timer = StageTimer()
+            with timer.stage('upload'):
                 content = await audio_file.read()
-                tmp_webm.write(content)
-                tmp_webm_path = tmp_webm.name
+            self.events.publish("transcription-progress", {"stage": "transcribing"})
 
-            # Convert WebM to WAV
-            wav_path = tmp_webm_path.replace('.webm', '.wav')
+            # Decode and recognize in the worker pool
+            transcription = await self.executor.run(transcribe_audio, content, time.time())
+            text = transcription['text']
+            timer.timings.update(transcription['timings'])
 
-            try:
-                # Convert audio using pydub
-                audio_segment = AudioSegment.from_file(tmp_webm_path, format="webm")
-                audio_segment.export(wav_path, format="wav")
-
-                # Process audio file with speech recognition
-                with sr.AudioFile(wav_path) as source:
-                    audio = self.recognizer.record(source)
-
-                # Convert speech to text
-                text = self.recognizer.recognize_google(audio)
-
-                if self.note_mode:
-                    # Note mode - save text directly
-                    note_content = text.strip()
-                    if note_content:
-                        filepath = self.save_note(note_content)
-                        result = {"status": "noted", "message": "NOTED!", "text": text}
-                    else:
-                        result = {"status": "error", "message": "Empty note"}
-                else:
-                    # Assistant mode - check for note commands
-                    if self.is_note_command(text):
-                        note_content = self.extract_note(text)
-                        filepath = self.save_note(note_content)
-                        result = {"status": "noted", "message": "NOTED!", "text": text}
-                    else:
-                        result = {"status": "error", "message": f"Heard: '{text}' (not a note command)", "text": text}
+            with timer.stage('save'):
+                result = await self.handle_transcript(text)
 
-            finally:
-                # Clean up temp files
-                if os.path.exists(tmp_webm_path):
-                    os.unlink(tmp_webm_path)
-                if os.path.exists(wav_path):
-                    os.unlink(wav_path)
+            result["timings"] = timer.timings
+            observe_timings(timer.timings)
 
-        except sr.UnknownValueError:
+        except TranscriptionBusy as e:
+            record_error('transcribe', e)
+            raise
+        except sr.UnknownValueError as e:
+            record_error('transcribe', e)
             result = {"status": "error", "message": "Couldn't understand audio"}
         except Exception as e:
+            record_error('transcribe', e)
             result = {"status": "error", "message": f"Error: {str(e)}"}
 
+        self.events.publish("transcription-progress", {"stage": "done", "status": result["status"]})
         return result
 
-# Initialize the app
-listeny = ListenyAPI()
+    async def process_batch(self, clips):
+        """Transcribe (filename, content, recorded_at) clips in parallel and save their notes together.
+
+        Clips run through the worker pool at most max_workers at a time, so
+        a large batch doesn't fill the queue that single uploads rely on.
+        The notes are committed in one grouped write, ordered by recording
+        time (upload order for clips without one). Results come back in
+        the order the clips were sent.
+        """
+        received = datetime.now(self.store.tz)
+        slots = asyncio.Semaphore(self.executor.max_workers)
+        self.events.publish("transcription-progress", {"stage": "batch", "total": len(clips), "done": 0})
+        done = 0
+
+        async def transcribe(content):
+            nonlocal done
+            async with slots:
+                try:
+                    return await self.executor.run(transcribe_audio, content, time.time())
+                finally:
+                    done += 1
+                    self.events.publish("transcription-progress", {"stage": "batch", "total": len(clips), "done": done})
+
+        transcriptions = await asyncio.gather(
+            *(transcribe(content) for _, content, _ in clips), return_exceptions=True
+        )
+
+        results = []
+        notes = []
+        for index, ((filename, _, recorded_at), transcription) in enumerate(zip(clips, transcriptions)):
+            result = {"filename": filename, "recorded_at": recorded_at.isoformat() if recorded_at else None}
+            if isinstance(transcription, Exception):
+                record_error('transcribe', transcription)
+            else:
+                observe_timings(transcription['timings'])
+
+            if isinstance(transcription, sr.UnknownValueError):
+                result.update({"status": "error", "message": "Couldn't understand audio"})
+            elif isinstance(transcription, TranscriptionBusy):
+                result.update({"status": "error", "message": str(transcription), "retry": True})
+            elif isinstance(transcription, Exception):
+                result.update({"status": "error", "message": f"Error: {str(transcription)}"})
+            else:
+                text = transcription['text']
+                note_content, error = self.transcript_note(text)
+                if error:
+                    result.update(error)
+                else:
+                    result.update({"status": "noted", "message": "NOTED!", "text": text})
+                    notes.append((recorded_at or received, index, note_content))
+                result["timings"] = transcription['timings']
+            results.append(result)
+
+        if notes:
+            notes.sort(key=lambda note: (note[0], note[1]))
+            with track('save_batch'):
+                entries = await self.save_notes([(content, when) for when, _, content in notes])
+            for (_, index, _), entry in zip(notes, entries):
+                results[index]["id"] = entry["id"]
+                results[index]["day"] = entry["day"]
+
+        self.events.publish("transcription-progress", {"stage": "done", "status": "batch"})
+        return {
+            "status": "success",
+            "saved": len(notes),
+            "failed": len(clips) - len(notes),
+            "results": results,
+        }
+
+    async def stream_audio(self, websocket: WebSocket, audio_format: str = "webm"):
+        """Transcribe audio chunks from a WebSocket as they arrive.
+
+        Binary messages carry audio (MediaRecorder WebM slices, or raw 16 kHz
+        mono s16le PCM when audio_format is "pcm"). A text message
+        {"type": "stop"} ends the stream. The server sends
+        {"type": "partial", "text": ...} while audio arrives and a final
+        {"type": "final", ...} with the same fields as /api/upload-audio.
+
+        Each socket holds one slot in the transcription pool while it's open
+        (raising TranscriptionBusy when the pool is full), and recognition
+        runs on the pool's threads, so streams share the uploads' limits.
+        Decoder pipe I/O is asynchronous and runs on the event loop itself.
+        """
+        with self.executor.stream_slot() as run_step:
+            await self._stream_audio(websocket, audio_format, run_step)
+
+    async def _stream_audio(self, websocket, audio_format, run_step):
+        stream = get_engine().create_stream()
+        decoder = await StreamingDecoder.start() if audio_format != "pcm" else None
+        last_partial = None
+
+        async def feed(pcm):
+            nonlocal last_partial
+            partial = await run_step(stream.accept, pcm)
+            if partial and partial != last_partial:
+                last_partial = partial
+                await websocket.send_json({"type": "partial", "text": partial})
+                self.events.publish("transcription-progress", {"stage": "partial", "text": partial})
+
+        async def pump_decoder():
+            # Forward decoded PCM to the recognizer until ffmpeg hits EOF
+            while True:
+                pcm = await decoder.read()
+                if not pcm:
+                    break
+                await feed(pcm)
+
+        pump = asyncio.create_task(pump_decoder()) if decoder else None
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes"):
+                    if decoder:
+                        await decoder.write(message["bytes"])
+                    else:
+                        await feed(message["bytes"])
+                elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                    break
+
+            # Flush the decoder and finalize
+            stopped = time.perf_counter()
+            if decoder:
+                decoder.close_input()
+                await pump
+            try:
+                text = await run_step(stream.finish)
+                result = await self.handle_transcript(text)
+            except sr.UnknownValueError as e:
+                record_error('stream', e)
+                result = {"status": "error", "message": "Couldn't understand audio"}
+            result["timings"] = {"finalize": round((time.perf_counter() - stopped) * 1000, 2)}
+            observe_timings(result["timings"])
+            self.events.publish("transcription-progress", {"stage": "done", "status": result["status"]})
+            await websocket.send_json({"type": "final", **result})
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if pump and not pump.done():
+                pump.cancel()
+            if decoder:
+                await decoder.close()
+
+# Initialize the app - sessions are opened per user on first request
+executor = TranscriptionExecutor()
+
+def open_session(user_id):
+    session = ListenyAPI(user_id, user_notes_dir(NOTES_DIR, user_id), executor)
+    # Sessions are opened from request handlers, i.e. on the event loop
+    session.events.bind(asyncio.get_running_loop())
+    return session
+
+sessions = SessionRegistry(open_session)
+
+async def get_listeny(connection: HTTPConnection):
+    """The session for the requesting user (X-Listeny-User header or ?user=).
+
+    The session is leased for the length of the request or WebSocket, so
+    it can't be evicted while in use. Streaming responses outlive the
+    handler and take their own lease with sessions.hold().
+    """
+    try:
+        user_id = resolve_user(connection.headers, connection.query_params)
+    except InvalidUser as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = sessions.acquire(user_id)
+    try:
+        yield session
+    finally:
+        sessions.release(user_id)
+
 app = FastAPI()
 
 # CORS middleware
@@ -147,51 +398,295 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Request latency by route template, so /api/notes/... doesn't explode the label set"""
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                route=route.path if route else "unmatched", status=status)
+
+def collect_queue_stats():
+    stats = executor.stats()
+    TRANSCRIBE_QUEUE.set(stats["pending"] - stats["queued"], state="running")
+    TRANSCRIBE_QUEUE.set(stats["queued"], state="queued")
+    TRANSCRIBE_QUEUE.set(stats["capacity"], state="capacity")
+    for model, model_stats in llm.stats()["models"].items():
+        LLM_QUEUE.set(model_stats["in_flight"], model=model, state="in_flight")
+        LLM_QUEUE.set(model_stats["waiting"], model=model, state="waiting")
+
+REGISTRY.add_collector(collect_queue_stats)
+
+@app.on_event("startup")
+async def startup():
+    await executor.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown():
+    executor.shutdown()
+    sessions.close_all()
+
 @app.get("/")
 async def root():
     return {"message": "Listeny API is running"}
 
 @app.post("/api/upload-audio")
-async def upload_audio(audio: UploadFile = File(...)):
+async def upload_audio(audio: UploadFile = File(...), listeny: ListenyAPI = Depends(get_listeny)):
     """Accept audio file from browser and process it"""
-    return await listeny.process_audio(audio)
+    try:
+        return await listeny.process_audio(audio)
+    except TranscriptionBusy as e:
+        # Backpressure - tell the client to retry instead of queueing forever
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def parse_recorded_at(value, tz):
+    """Recording time from a client: epoch milliseconds (File.lastModified) or ISO 8601"""
+    if not value:
+        return None
+    try:
+        millis = float(value)
+    except ValueError:
+        millis = None
+    if millis is not None:
+        try:
+            return datetime.fromtimestamp(millis / 1000, tz=timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError(f"recorded_at out of range: {value}")
+    when = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return when if when.tzinfo else when.replace(tzinfo=tz)
+
+def batch_too_large():
+    return HTTPException(status_code=413,
+                         detail=f"At most {BATCH_MAX_CLIPS} clips and {BATCH_MAX_MB} MB of audio per batch")
+
+def expand_archive(content, tz, max_clips, max_bytes):
+    """(filename, content, recorded_at) for each file in a zip, timed by its zip entry.
+
+    Members are counted and their uncompressed sizes added up from the
+    zip directory before anything is inflated; reads never go past the
+    declared size, so a decompression bomb is turned away up front.
+    """
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        members = []
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            members.append(info)
+        if len(members) > max_clips or sum(info.file_size for info in members) > max_bytes:
+            raise batch_too_large()
+        return [(info.filename, archive.read(info), datetime(*info.date_time, tzinfo=tz)) for info in members]
+
+@app.post("/api/upload-audio/batch")
+async def upload_audio_batch(audio: List[UploadFile] = File(...), recorded_at: Optional[List[str]] = Form(None),
+                             listeny: ListenyAPI = Depends(get_listeny)):
+    """Transcribe many clips (or .zip archives of clips) in one request.
+
+    `recorded_at` optionally gives each uploaded file's recording time,
+    in the same order as the files; notes are saved in that time order.
+    """
+    tz = listeny.store.tz
+    recorded_at = recorded_at or []
+    clips = []
+    total_bytes = 0
+    max_bytes = BATCH_MAX_MB * 1024 * 1024
+    try:
+        for i, upload in enumerate(audio):
+            # Never read more of a file than the batch has room for
+            remaining = max_bytes - total_bytes
+            if upload.size is not None and upload.size > remaining:
+                raise batch_too_large()
+            content = await upload.read(remaining + 1)
+            if len(content) > remaining:
+                raise batch_too_large()
+            if zipfile.is_zipfile(io.BytesIO(content)):
+                members = expand_archive(content, tz, BATCH_MAX_CLIPS - len(clips), max_bytes - total_bytes)
+            else:
+                when = parse_recorded_at(recorded_at[i], tz) if i < len(recorded_at) else None
+                members = [(upload.filename, content, when)]
+            clips.extend(members)
+            total_bytes += sum(len(clip) for _, clip, _ in members)
+            if len(clips) > BATCH_MAX_CLIPS or total_bytes > max_bytes:
+                raise batch_too_large()
+    except (ValueError, OverflowError, OSError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Bad batch upload: {str(e)}")
+
+    if not clips:
+        raise HTTPException(status_code=400, detail="No audio clips in upload")
+
+    return await listeny.process_batch(clips)
+
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(websocket: WebSocket, format: str = "webm", listeny: ListenyAPI = Depends(get_listeny)):
+    """Stream audio while recording and get partial transcripts back"""
+    await websocket.accept()
+    try:
+        await listeny.stream_audio(websocket, format)
+    except TranscriptionBusy as e:
+        # Backpressure - the client should retry, like a 503 from /api/upload-audio
+        record_error('stream', e)
+        await websocket.send_json({"type": "final", "status": "error", "message": str(e), "retry": True})
+        await websocket.close(code=1013)
+    except Exception as e:
+        await websocket.send_json({"type": "final", "status": "error", "message": f"Error: {str(e)}"})
+        await websocket.close()
 
 @app.post("/api/manual-note")
-async def manual_note(request: NoteRequest):
+async def manual_note(request: NoteRequest, listeny: ListenyAPI = Depends(get_listeny)):
     if request.text:
-        filepath = listeny.save_note(request.text)
+        filepath = await listeny.save_note(request.text)
         return {"status": "noted", "message": "Note saved manually", "content": request.text}
     return {"status": "error", "message": "No note content"}
 
 @app.get("/api/status")
-async def get_status():
+async def get_status(listeny: ListenyAPI = Depends(get_listeny)):
     return {
         "status": "idle",
+        "user": listeny.user_id,
         "note_mode": listeny.note_mode,
-        "notes_count": len(listeny.notes_history)
+        "notes_count": listeny.notes_saved,
+        "sessions": len(sessions.all()),
+        "transcription": executor.stats(),
+        "llm": llm.stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of latency histograms, error counters and queue gauges"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/events")
+async def stream_events(request: Request, listeny: ListenyAPI = Depends(get_listeny)):
+    """Server-Sent Events stream of note-saved, mode-changed and transcription-progress"""
+    return StreamingResponse(
+        sessions.hold(listeny.user_id, listeny.events.stream(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/notes")
-async def get_notes():
-    # Get today's notes
-    chicago_tz = ZoneInfo("America/Chicago")
-    today = datetime.now(chicago_tz)
-    filename = today.strftime('%Y-%m-%d') + '.md'
-    filepath = os.path.join(listeny.notes_dir, filename)
+async def get_notes(request: Request, response: Response, since: Optional[int] = None,
+                    cursor_day: Optional[str] = Query(None, alias="day"),
+                    listeny: ListenyAPI = Depends(get_listeny)):
+    """Today's notes as markdown, or only entries after note id `since`.
+
+    Note ids restart every day, so an incremental poll passes back the
+    `day` of its cursor too; a cursor from another day (a poll that
+    crossed midnight) gets all of today's entries.
+
+    Responses carry an ETag; a matching If-None-Match gets a 304.
+    """
+    cursor_day = parse_day(cursor_day, "day")
+    day = listeny.store.day_key()
+    filename = day + '.md'
+
+    etag = listeny.notes_etag(day)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+    if since is not None:
+        # Incremental poll - only entries the client hasn't seen
+        if cursor_day and cursor_day != day:
+            since = -1
+        entries = listeny.store.entries(day, start=since + 1)
+        next_id = entries[-1]["id"] if entries else since
+        return {"entries": entries, "since": next_id, "day": day, "filename": filename}
+
+    return {"notes": listeny.notes_markdown(day), "filename": filename}
+
+def parse_day(value, name):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a date like 2025-01-31")
+
+@app.get("/api/search")
+async def search_notes(q: str, day_from: Optional[str] = Query(None, alias="from"), to: Optional[str] = None,
+                       page: int = Query(1, ge=1), limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+                       listeny: ListenyAPI = Depends(get_listeny)):
+    """Full-text search over all of the user's notes, best matches first.
+
+    `from` and `to` (YYYY-MM-DD, inclusive) limit the days searched.
+    """
+    day_from, day_to = parse_day(day_from, "from"), parse_day(to, "to")
+    loop = asyncio.get_running_loop()
+    with track('search'):
+        return await loop.run_in_executor(None, listeny.search.search, q, day_from, day_to, page, limit)
+
+@app.get("/api/notes/history")
+async def notes_history(before: Optional[str] = None, limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=365),
+                        listeny: ListenyAPI = Depends(get_listeny)):
+    """Days that have notes, newest first, with their note counts.
+
+    Pass the returned `next` as `before` for the following page.
+    """
+    before = parse_day(before, "before")
+    days = listeny.store.days()
+    if before:
+        days = [day for day in days if day < before]
+    page = days[::-1][:limit]
+    return {
+        "days": [{"day": day, "count": listeny.store.count(day)} for day in page],
+        "next": page[-1] if len(days) > limit else None,
+    }
 
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            content = f.read()
-        return {"notes": content, "filename": filename}
+@app.get("/api/notes/{date}")
+async def notes_for_day(date: str, request: Request, response: Response, cursor: int = Query(0, ge=0),
+                        limit: int = Query(NOTES_PAGE_SIZE, ge=1, le=500),
+                        listeny: ListenyAPI = Depends(get_listeny)):
+    """One day's entries from `cursor` on, read through the day's offset index.
+
+    Only the requested entries are read from disk. `next_cursor` is null
+    on the last page. The ETag changes whenever the day gets a new note.
+    """
+    day = parse_day(date, "date")
+    total = listeny.store.count(day)
+    if total == 0:
+        raise HTTPException(status_code=404, detail=f"No notes for {day}")
+
+    etag = listeny.notes_etag(day)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    entries = listeny.store.entries(day, start=cursor, limit=limit)
+    next_cursor = cursor + len(entries)
+    return {
+        "day": day,
+        "total": total,
+        "entries": entries,
+        "next_cursor": next_cursor if next_cursor < total else None,
+    }
 
-    return {"notes": "", "filename": filename}
+@app.get("/api/recall")
+async def recall_notes(q: str, k: int = Query(RECALL_TOP_K, ge=1, le=50), listeny: ListenyAPI = Depends(get_listeny)):
+    """Notes closest in meaning to the query (embedding similarity), best first"""
+    loop = asyncio.get_running_loop()
+    try:
+        with track('recall'):
+            results = await loop.run_in_executor(None, listeny.recall.recall, q, k)
+    except Exception as e:
+        return {"status": "error", "message": f"Error recalling notes: {str(e) or type(e).__name__}", "results": []}
+    return {"status": "success", "query": q, "results": results}
 
 @app.post("/api/mode")
-async def set_mode(request: NoteRequest):
+async def set_mode(request: NoteRequest, listeny: ListenyAPI = Depends(get_listeny)):
     if request.action == "note":
-        listeny.note_mode = True
+        listeny.set_mode(True)
     elif request.action == "assistant":
-        listeny.note_mode = False
+        listeny.set_mode(False)
 
     return {
         "status": "success",
@@ -199,63 +694,234 @@ async def set_mode(request: NoteRequest):
         "message": f"Switched to {'Note' if listeny.note_mode else 'Assistant'} mode"
     }
 
-@app.get("/api/summarize-notes")
-async def summarize_notes():
-    """Get today's notes and summarize them using Ollama"""
+def summary_prompt(notes_content):
+    return f"""Please summarize the following notes in a concise, natural way that can be read aloud.
+Focus on the key points and action items. Keep it brief and conversational.
+
+Notes:
+{notes_content}
+
+Summary:"""
+
+def update_prompt(previous_summary, new_notes):
+    return f"""Here is a summary of earlier notes from today:
+{previous_summary}
+
+These notes were added since:
+{new_notes}
+
+Update the summary so it also covers the new notes. Keep it concise, natural and easy to read aloud, focusing on the key points and action items.
+
+Summary:"""
+
+def reduce_prompt(parts):
+    sections = '\n\n'.join(
+        f"{first if first == last else f'{first} to {last}'}:\n{summary}" for first, last, summary in parts
+    )
+    return f"""Below are summaries of my notes, one per period, in date order.
+Combine them into a single concise summary that can be read aloud. Keep the
+key points and any action items that are still open, and mention when
+things happened where it matters.
+
+{sections}
+
+Summary:"""
+
+def plan_summary(listeny, day):
+    """Decide how to summarize a day: cached result, incremental update, or full pass"""
+    content = listeny.notes_markdown(day)
+    count = listeny.store.count(day)
+    plan = {
+        "key": listeny.summaries.key(SUMMARY_MODEL, content),
+        "day": day,
+        "count": count,
+        "cached": None,
+        "incremental": False,
+    }
+
+    hit = listeny.summaries.get(plan["key"])
+    if hit:
+        plan["cached"] = hit["summary"]
+        return plan
+
+    previous = listeny.summaries.latest(SUMMARY_MODEL, day)
+    if previous and 0 < previous["count"] < count:
+        # Only the notes added since the last summary go to the model
+        new_entries = listeny.store.entries(day, start=previous["count"])
+        new_notes = '\n'.join(f"- **{e['time']}**: {e['content']}" for e in new_entries)
+        plan["prompt"] = update_prompt(previous["summary"], new_notes)
+        plan["incremental"] = True
+    else:
+        plan["prompt"] = summary_prompt(content)
+    return plan
+
+def summary_messages(plan):
+    return [{
+        'role': 'user',
+        'content': plan["prompt"]
+    }]
+
+async def stream_summary(listeny, plan):
+    """Yield summary text chunks as Ollama generates them, caching the result"""
+    if plan["cached"] is not None:
+        yield plan["cached"]
+        return
+
+    summary = ""
     try:
-        # Get today's notes
-        chicago_tz = ZoneInfo("America/Chicago")
-        today = datetime.now(chicago_tz)
-        filename = today.strftime('%Y-%m-%d') + '.md'
-        filepath = os.path.join(listeny.notes_dir, filename)
+        with track('summarize'):
+            async for chunk in llm.chat_stream(model=SUMMARY_MODEL, messages=summary_messages(plan)):
+                summary += chunk
+                yield chunk
+    except Exception as e:
+        yield f"\nSorry, I couldn't finish the summary: {str(e) or type(e).__name__}"
+        return
+
+    listeny.summaries.put(plan["key"], summary, SUMMARY_MODEL, day=plan["day"], count=plan["count"])
+
+async def summarize_day(listeny, day, plan=None):
+    """Summary of one day's notes, from the cache when the notes haven't changed"""
+    plan = plan or plan_summary(listeny, day)
+    if plan["cached"] is not None:
+        return plan["cached"], plan
+
+    with track('summarize'):
+        summary = await llm.chat(model=SUMMARY_MODEL, messages=summary_messages(plan))
+    listeny.summaries.put(plan["key"], summary, SUMMARY_MODEL, day=plan["day"], count=plan["count"])
+    return summary, plan
+
+async def reduce_group(listeny, group, slots):
+    """Merge consecutive (first_day, last_day, summary) parts into one"""
+    if len(group) == 1:
+        return group[0]
+    prompt = reduce_prompt(group)
+    key = listeny.summaries.key(SUMMARY_MODEL, prompt)
+    hit = listeny.summaries.get(key)
+    if hit:
+        summary = hit["summary"]
+    else:
+        async with slots:
+            with track('summarize_reduce'):
+                summary = await llm.chat(model=SUMMARY_MODEL, messages=[{'role': 'user', 'content': prompt}])
+        listeny.summaries.put(key, summary, SUMMARY_MODEL)
+    return (group[0][0], group[-1][1], summary)
+
+async def reduce_summaries(listeny, parts, slots):
+    """Merge per-day summaries SUMMARY_FAN_IN at a time, level by level, until one is left.
+
+    Each prompt stays the size of a few summaries however long the range,
+    and unchanged groups come straight from the cache.
+    """
+    levels = 0
+    while len(parts) > 1:
+        groups = [parts[i:i + SUMMARY_FAN_IN] for i in range(0, len(parts), SUMMARY_FAN_IN)]
+        parts = await asyncio.gather(*(reduce_group(listeny, group, slots) for group in groups))
+        levels += 1
+    return parts[0][2], levels
+
+@app.get("/api/summarize")
+async def summarize_range(day_from: Optional[str] = Query(None, alias="from"), to: Optional[str] = None,
+                          listeny: ListenyAPI = Depends(get_listeny)):
+    """Summarize the notes from `from` to `to` (YYYY-MM-DD, inclusive; default today).
+
+    Each day is summarized on its own, a few at a time, and cached, so a
+    re-run only sends days whose notes changed. The day summaries are then
+    merged hierarchically into one.
+    """
+    today = listeny.store.day_key()
+    day_to = parse_day(to, "to") or today
+    day_from = parse_day(day_from, "from") or day_to
+    if day_from > day_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    span = (datetime.strptime(day_to, '%Y-%m-%d') - datetime.strptime(day_from, '%Y-%m-%d')).days + 1
+    if span > SUMMARY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {SUMMARY_MAX_DAYS} days per summary")
+
+    days = [day for day in listeny.store.days() if day_from <= day <= day_to and listeny.store.count(day) > 0]
+    if not days:
+        return {
+            "status": "error",
+            "message": f"No notes found from {day_from} to {day_to}",
+            "summary": "You don't have any notes for those days."
+        }
 
-        if not os.path.exists(filepath):
-            return {
-                "status": "error",
-                "message": "No notes found for today",
-                "summary": "You haven't taken any notes today yet."
-            }
+    slots = asyncio.Semaphore(SUMMARY_PARALLEL)
 
-        with open(filepath, 'r') as f:
-            notes_content = f.read()
+    async def summarize_one(day):
+        async with slots:
+            return await summarize_day(listeny, day)
 
-        if not notes_content.strip():
+    try:
+        results = await asyncio.gather(*(summarize_one(day) for day in days))
+        parts = [(day, day, summary) for day, (summary, _) in zip(days, results)]
+        summary, levels = await reduce_summaries(listeny, parts, slots)
+    except LLMBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error summarizing notes: {str(e) or type(e).__name__}",
+            "summary": "Sorry, I couldn't summarize your notes right now."
+        }
+
+    return {
+        "status": "success",
+        "from": day_from,
+        "to": day_to,
+        "summary": summary,
+        "levels": levels,
+        "days": [{
+            "day": day,
+            "summary": day_summary,
+            "notes_count": plan["count"],
+            "cached": plan["cached"] is not None,
+        } for day, (day_summary, plan) in zip(days, results)],
+    }
+
+@app.get("/api/summarize-notes")
+async def summarize_notes(stream: bool = False, listeny: ListenyAPI = Depends(get_listeny)):
+    """Get today's notes and summarize them using Ollama.
+
+    Summaries are cached by content; when notes were added since the last
+    summary only the new ones are sent and merged into it. With
+    ?stream=true the summary is sent as plain text chunks while the model
+    generates it, so the client can start reading aloud right away.
+    """
+    try:
+        # Get today's notes
+        if listeny.store.count() == 0:
             return {
                 "status": "error",
-                "message": "Notes file is empty",
+                "message": "No notes found for today",
                 "summary": "You haven't taken any notes today yet."
             }
 
-        # Create prompt for Ollama
-        prompt = f"""Please summarize the following notes in a concise, natural way that can be read aloud.
-Focus on the key points and action items. Keep it brief and conversational.
+        plan = plan_summary(listeny, listeny.store.day_key())
 
-Notes:
-{notes_content}
-
-Summary:"""
-
-        # Call Ollama to summarize
-        response = ollama_client.chat(
-            model='llama3.2',
-            messages=[{
-                'role': 'user',
-                'content': prompt
-            }]
-        )
+        if stream:
+            return StreamingResponse(
+                sessions.hold(listeny.user_id, stream_summary(listeny, plan)),
+                media_type="text/plain; charset=utf-8",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
-        summary = response['message']['content']
+        # Call Ollama to summarize, unless the cache already has it
+        summary, plan = await summarize_day(listeny, plan["day"], plan)
 
         return {
             "status": "success",
             "summary": summary,
-            "notes_count": len(listeny.notes_history)
+            "cached": plan["cached"] is not None,
+            "incremental": plan["incremental"],
+            "notes_count": listeny.notes_saved
         }
 
+    except LLMBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         return {
             "status": "error",
-            "message": f"Error summarizing notes: {str(e)}",
+            "message": f"Error summarizing notes: {str(e) or type(e).__name__}",
             "summary": "Sorry, I couldn't summarize your notes right now."
         }
 
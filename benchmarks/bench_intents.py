@@ -0,0 +1,72 @@
+"""Micro-benchmark: compiled intent router vs the old linear trigger scans.
+
+    python benchmarks/bench_intents.py [--number 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import NOTE_TRIGGERS, COMMAND_WORDS, classify
+
+UTTERANCES = [
+    "Note this: meeting with team at 3pm",
+    "Remember that I need to review the PR before the release goes out on Friday",
+    "Create a new Python file called app.py",
+    "What's the weather going to be like tomorrow afternoon",
+    "Can you summarize what we talked about in the standup this morning and jot down the action items",
+    "Run the tests for this project",
+    "Tell me a joke",
+]
+
+
+def legacy_route(text):
+    """The per-module logic this replaces: detect, extract, then command scan"""
+    text_lower = text.lower()
+    if any(trigger in text_lower for trigger in NOTE_TRIGGERS):
+        note = text
+        for trigger in NOTE_TRIGGERS:
+            if trigger in text_lower:
+                idx = text_lower.find(trigger) + len(trigger)
+                note = text[idx:].strip()
+                for filler in ['that', 'to', ':', '-']:
+                    if note.lower().startswith(filler):
+                        note = note[len(filler):].strip()
+                break
+        return 'note', note
+    if any(word in text.lower() for word in COMMAND_WORDS):
+        return 'command', text
+    return 'chat', text
+
+
+def compiled_route(text):
+    intent = classify(text)
+    return intent.kind, intent.payload
+
+
+def bench(func, number):
+    seconds = timeit.timeit(lambda: [func(u) for u in UTTERANCES], number=number)
+    return seconds / (number * len(UTTERANCES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    for utterance in UTTERANCES:
+        legacy, compiled = legacy_route(utterance), compiled_route(utterance)
+        marker = '' if legacy == compiled else '   (differs)'
+        print(f"{compiled[0]:8} {utterance[:60]}{marker}")
+
+    legacy_us = bench(legacy_route, args.number)
+    compiled_us = bench(compiled_route, args.number)
+    print()
+    print(f"legacy scans:    {legacy_us:7.2f} us/utterance")
+    print(f"compiled router: {compiled_us:7.2f} us/utterance ({legacy_us / compiled_us:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
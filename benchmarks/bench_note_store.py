@@ -0,0 +1,93 @@
+"""Note store throughput under concurrent readers, with an index consistency check.
+
+    python benchmarks/bench_note_store.py [--notes 300] [--writers 1] [--readers 1]
+        [--fsync always|interval|never]
+
+Writer threads append notes one at a time while reader threads poll
+count() and entries(), the way /api/notes polls, search and recall
+backfill do. Afterwards the day's ids must run 0..N-1 with every note
+present exactly once; the script exits non-zero if not.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_store import NoteStore
+
+
+def check(store, expected):
+    """Problems with the day's index after the run (empty when consistent)"""
+    problems = []
+    entries = store.entries()
+    if store.count() != len(expected):
+        problems.append(f"count() is {store.count()}, expected {len(expected)}")
+    if [entry['id'] for entry in entries] != list(range(len(entries))):
+        problems.append("entry ids are not consecutive")
+    contents = [entry['content'] for entry in entries]
+    if sorted(contents) != sorted(expected):
+        problems.append("entries don't match the notes written")
+    for entry in entries:
+        again = store.entries(start=entry['id'], limit=1)
+        if not again or again[0]['content'] != entry['content']:
+            problems.append(f"entries(start={entry['id']}) returns the wrong note")
+            break
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=300, help='notes per writer')
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--readers', type=int, default=1)
+    parser.add_argument('--fsync', choices=['always', 'interval', 'never'], default='always')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as notes_dir:
+        store = NoteStore(notes_dir, fsync=args.fsync)
+        writing = threading.Event()
+        writing.set()
+        reads = 0
+
+        def write(writer):
+            for i in range(args.notes):
+                store.append(f"note {writer}/{i}")
+
+        def read():
+            nonlocal reads
+            while writing.is_set():
+                count = store.count()
+                store.entries(start=max(count - 5, 0))
+                reads += 1
+
+        readers = [threading.Thread(target=read) for _ in range(args.readers)]
+        writers = [threading.Thread(target=write, args=(w,)) for w in range(args.writers)]
+        start = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        writing.clear()
+        for thread in readers:
+            thread.join()
+
+        expected = [f"note {w}/{i}" for w in range(args.writers) for i in range(args.notes)]
+        problems = check(store, expected)
+        store.close()
+
+    print(f"{len(expected)} notes in {elapsed:.2f}s ({len(expected) / elapsed:.0f} notes/s, "
+          f"fsync={args.fsync}), {reads} concurrent reads")
+    if problems:
+        for problem in problems:
+            print(f"INCONSISTENT: {problem}")
+        sys.exit(1)
+    print("index consistent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""Load test for the backend note pipeline with synthetic audio and fake models.
+
+    python benchmarks/bench_pipeline.py [--requests 200] [--concurrency 8]
+        [--scenarios upload,manual-note,notes,summarize] [--format wav|webm]
+        [--recognize-ms 50] [--llm-ms 200] [--save NAME] [--compare NAME]
+
+The recognizer and Ollama are replaced by local fakes with fixed delays,
+so results measure Listeny's own overhead (decode, queueing, note writes,
+rendering) rather than the models. Requests go through the real FastAPI
+app in-process via httpx's ASGI transport, against a temporary notes
+directory. Baselines are saved to benchmarks/baselines/NAME.json.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ['upload', 'manual-note', 'notes', 'summarize']
+# Scenarios where every successful request saves one note
+SAVING = {'upload', 'manual-note'}
+
+
+def synthetic_wav(seconds=1.5, rate=16000):
+    """A speech-length clip: a 220 Hz tone with a syllable-like amplitude envelope"""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)
+        sample = int(8000 * envelope * math.sin(2 * math.pi * 220 * t))
+        frames += sample.to_bytes(2, 'little', signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as clip:
+        clip.setnchannels(1)
+        clip.setsampwidth(2)
+        clip.setframerate(rate)
+        clip.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def synthetic_webm(wav):
+    """The WAV clip re-encoded as Opus in WebM, like a browser MediaRecorder upload"""
+    proc = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'wav', '-i', 'pipe:0',
+         '-c:a', 'libopus', '-f', 'webm', 'pipe:1'],
+        input=wav,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"ffmpeg could not encode WebM: {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout
+
+
+def fake_engine(delay):
+    from speech_engine import SpeechEngine
+
+    class FakeEngine(SpeechEngine):
+        """Recognizer stand-in that takes a fixed time and returns a fixed note"""
+
+        name = 'fake'
+
+        def transcribe(self, audio):
+            time.sleep(delay)
+            return f"benchmark note of {len(audio.frame_data)} bytes"
+
+    return FakeEngine()
+
+
+class FakeGateway:
+    """LLMGateway stand-in with a fixed generation time"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def chat(self, model, messages, **kwargs):
+        await asyncio.sleep(self.delay)
+        return "You took several benchmark notes today."
+
+    async def chat_stream(self, model, messages, **kwargs):
+        words = "You took several benchmark notes today.".split()
+        for word in words:
+            await asyncio.sleep(self.delay / len(words))
+            yield word + ' '
+
+    def stats(self):
+        return {"max_in_flight": 0, "max_queue": 0, "models": {}}
+
+
+class FakeEmbedder:
+    """Ollama client stand-in for note embeddings: a fixed vector per text"""
+
+    def embed(self, model, input, **kwargs):
+        return {"embeddings": [[float(len(text) % 7 + 1), 1.0, 0.5, 0.25] for text in input]}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(values):
+    return {f"p{pct}": round(percentile(values, pct), 2) for pct in (50, 95, 99)}
+
+
+def requests_for(scenario, clip, content_type):
+    if scenario == 'upload':
+        return lambda client: client.post('/api/upload-audio', files={'audio': ('clip', clip, content_type)})
+    if scenario == 'manual-note':
+        return lambda client: client.post('/api/manual-note', json={'action': 'note', 'text': 'benchmark manual note'})
+    if scenario == 'notes':
+        return lambda client: client.get('/api/notes')
+    if scenario == 'summarize':
+        return lambda client: client.get('/api/summarize-notes')
+    raise SystemExit(f"Unknown scenario '{scenario}' (choose from {', '.join(SCENARIOS)})")
+
+
+async def run_scenario(client, scenario, request, total, concurrency):
+    latencies = []
+    stages = {}
+    errors = 0
+    issued = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(issued) < total:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            body = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+            if response.status_code >= 400 or body.get('status') == 'error':
+                errors += 1
+            for stage, ms in (body.get('timings') or {}).items():
+                stages.setdefault(stage, []).append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(total / elapsed, 1),
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())},
+    }
+    if scenario in SAVING:
+        result["notes_per_sec"] = round((total - errors) / elapsed, 1)
+    return result
+
+
+async def run(args, clip, content_type):
+    import httpx
+    import backend
+    import speech_engine
+
+    speech_engine._engine = fake_engine(args.recognize_ms / 1000)
+    backend.llm = FakeGateway(args.llm_ms / 1000)
+    backend.embed_client = FakeEmbedder()
+    await backend.startup()
+
+    results = {}
+    transport = httpx.ASGITransport(app=backend.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+            # Seed a note so the read scenarios have something to render
+            await client.post('/api/manual-note', json={'action': 'note', 'text': 'benchmark seed note'})
+            for scenario in args.scenarios:
+                request = requests_for(scenario, clip, content_type)
+                results[scenario] = await run_scenario(client, scenario, request, args.requests, args.concurrency)
+                print_result(scenario, results[scenario])
+    finally:
+        await backend.shutdown()
+    return results
+
+
+def print_result(scenario, result):
+    latency = result["latency_ms"]
+    line = (f"{scenario:12} {result['requests_per_sec']:8.1f} req/s   "
+            f"p50 {latency['p50']:8.2f}  p95 {latency['p95']:8.2f}  p99 {latency['p99']:8.2f} ms")
+    if "notes_per_sec" in result:
+        line += f"   {result['notes_per_sec']:.1f} notes/s"
+    if result["errors"]:
+        line += f"   ({result['errors']} errors)"
+    print(line)
+    for stage, values in result["stages_ms"].items():
+        print(f"  {stage:10} p50 {values['p50']:8.2f}  p95 {values['p95']:8.2f}  p99 {values['p99']:8.2f} ms")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(results, baseline):
+    """Print latency and throughput change against a saved baseline (positive = slower)"""
+    print()
+    print(f"vs baseline {baseline.get('commit') or '?'} ({baseline['created']})")
+    for scenario, result in results.items():
+        before = baseline["results"].get(scenario)
+        if not before:
+            continue
+        changes = []
+        for pct in ('p50', 'p95', 'p99'):
+            old, new = before["latency_ms"][pct], result["latency_ms"][pct]
+            changes.append(f"{pct} {(new - old) / old * 100 if old else 0:+6.1f}%")
+        old, new = before["requests_per_sec"], result["requests_per_sec"]
+        changes.append(f"throughput {(new - old) / old * 100 if old else 0:+6.1f}%")
+        print(f"{scenario:12} " + '  '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--format', choices=['wav', 'webm'], default='wav')
+    parser.add_argument('--recognize-ms', type=float, default=50, help='fake recognizer time per clip')
+    parser.add_argument('--llm-ms', type=float, default=200, help='fake Ollama time per summary')
+    parser.add_argument('--save', metavar='NAME', help='save results as a baseline')
+    parser.add_argument('--compare', metavar='NAME', help='compare with a saved baseline')
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+
+    clip = synthetic_wav()
+    content_type = 'audio/wav'
+    if args.format == 'webm':
+        clip, content_type = synthetic_webm(clip), 'audio/webm'
+
+    with tempfile.TemporaryDirectory() as notes_dir:
+        # Configure the backend before it is imported: scratch notes, in-process workers
+        os.environ['NOTES_DIR'] = notes_dir
+        os.environ['TRANSCRIBE_EXECUTOR'] = 'thread'
+        results = asyncio.run(run(args, clip, content_type))
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {key: getattr(args, key) for key in
+                     ('requests', 'concurrency', 'format', 'recognize_ms', 'llm_ms')},
+        "results": results,
+    }
+
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            compare(results, json.load(f))
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save), 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {os.path.relpath(baseline_path(args.save), ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
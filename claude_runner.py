@@ -0,0 +1,211 @@
+import itertools
+import os
+import queue
+import subprocess
+import threading
+import time
+
+# Warm processes kept ready, and the run timeout per command (seconds)
+CLAUDE_POOL_SIZE = int(os.getenv('CLAUDE_POOL_SIZE', '2'))
+CLAUDE_TIMEOUT = float(os.getenv('CLAUDE_TIMEOUT', '30'))
+
+# Print mode reads the prompt from stdin, so a process can be started
+# ahead of time and handed its command later
+CLAUDE_COMMAND = ['claude', '--dangerously-skip-permissions', '-p']
+
+
+class ClaudeJob:
+    """One command for Claude Code, with its streamed output and timings"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, command, on_output=None, on_done=None):
+        self.id = next(self._ids)
+        self.command = command
+        self.on_output = on_output
+        self.on_done = on_done
+
+        self.status = 'queued'
+        self.output = []
+        self.process = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def result(self):
+        return ''.join(self.output).strip()
+
+    @property
+    def queue_seconds(self):
+        return (self.started or time.monotonic()) - self.submitted
+
+    @property
+    def run_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        """Drop the job if it's still queued, or kill it if it's running"""
+        if self.status in ('queued', 'running'):
+            self.status = 'cancelled'
+            if self.process and self.process.poll() is None:
+                self.process.kill()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.result
+
+
+class ClaudeExecutor:
+    """Job queue in front of a small pool of pre-started Claude Code processes.
+
+    Workers take a warm process (already past CLI startup and waiting for
+    its prompt on stdin), feed it the command and stream stdout back line
+    by line. A replacement process is started in the background right
+    away, so the next command doesn't pay the startup cost either.
+    """
+
+    def __init__(self, pool_size=CLAUDE_POOL_SIZE, timeout=CLAUDE_TIMEOUT, command=CLAUDE_COMMAND):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.command = command
+
+        self.jobs = queue.Queue()
+        self.warm = queue.Queue()
+        self.running = set()
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.total_queue_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+        for _ in range(pool_size):
+            threading.Thread(target=self._prestart, daemon=True).start()
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, command, on_output=None, on_done=None):
+        """Queue a command; on_output gets each stdout line, on_done the finished job"""
+        job = ClaudeJob(command, on_output, on_done)
+        self.jobs.put(job)
+        return job
+
+    def cancel_all(self):
+        with self.lock:
+            running = list(self.running)
+        for job in running:
+            job.cancel()
+        while True:
+            try:
+                self.jobs.get_nowait().cancel()
+            except queue.Empty:
+                break
+
+    def _spawn(self):
+        return subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+
+    def _prestart(self):
+        try:
+            self.warm.put(self._spawn())
+        except Exception as e:
+            print(f"Could not pre-start Claude Code: {e}")
+
+    def _take_process(self):
+        # Prefer a warm process that is still alive, then top the pool back up
+        while True:
+            try:
+                process = self.warm.get_nowait()
+            except queue.Empty:
+                process = self._spawn()
+                break
+            if process.poll() is None:
+                break
+        threading.Thread(target=self._prestart, daemon=True).start()
+        return process
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job.status == 'cancelled':
+                self._finish(job)
+                continue
+
+            try:
+                job.process = self._take_process()
+                job.started = time.monotonic()
+                job.status = 'running'
+                with self.lock:
+                    self.running.add(job)
+                self._run(job)
+            except Exception as e:
+                job.output.append(f"Error executing command: {str(e)}")
+                job.status = 'error'
+            finally:
+                with self.lock:
+                    self.running.discard(job)
+                self._finish(job)
+
+    def _run(self, job):
+        process = job.process
+
+        # Kill the process if it runs past the timeout
+        timer = threading.Timer(self.timeout, self._expire, args=(job,))
+        timer.start()
+        try:
+            process.stdin.write(job.command)
+            process.stdin.close()
+            for line in process.stdout:
+                job.output.append(line)
+                if job.on_output:
+                    job.on_output(line.rstrip('\n'))
+            process.wait()
+        finally:
+            timer.cancel()
+
+        if job.status == 'running':
+            job.status = 'done'
+        elif job.status == 'timeout':
+            job.output.append("\nCommand timed out")
+
+    def _expire(self, job):
+        if job.status == 'running':
+            job.status = 'timeout'
+            job.process.kill()
+
+    def _finish(self, job):
+        job.finished = time.monotonic()
+        with self.lock:
+            self.completed += 1
+            self.total_queue_seconds += job.queue_seconds
+            self.total_run_seconds += job.run_seconds
+        job._done.set()
+        if job.on_done:
+            job.on_done(job)
+
+    def stats(self):
+        with self.lock:
+            completed = self.completed
+            return {
+                "queued": self.jobs.qsize(),
+                "running": len(self.running),
+                "warm": self.warm.qsize(),
+                "completed": completed,
+                "avg_queue_seconds": round(self.total_queue_seconds / completed, 3) if completed else 0.0,
+                "avg_run_seconds": round(self.total_run_seconds / completed, 3) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        self.cancel_all()
+        while True:
+            try:
+                self.warm.get_nowait().kill()
+            except queue.Empty:
+                break
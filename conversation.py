@@ -0,0 +1,88 @@
+import os
+import threading
+
+# Rolling history limits and how long Ollama keeps the model (and its
+# prompt cache) loaded between turns
+CONVERSATION_MAX_TURNS = int(os.getenv('CONVERSATION_MAX_TURNS', '12'))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '4096'))
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) for budgeting"""
+    return len(text) // 4 + 1
+
+
+class ConversationSession:
+    """Multi-turn chat with Ollama that keeps the prompt prefix stable.
+
+    Every request starts with the same system message followed by the
+    same prior turns, and the model is kept loaded with keep_alive, so
+    Ollama reuses its cached prefix and only evaluates the newest turn.
+    When the history outgrows the budget the oldest turns are dropped in
+    one go (down to half the budget) rather than one per turn, so the
+    prefix stays unchanged for several turns between trims.
+    """
+
+    def __init__(self, client, model, system_prompt, max_turns=CONVERSATION_MAX_TURNS,
+                 token_budget=CONVERSATION_TOKEN_BUDGET, keep_alive=OLLAMA_KEEP_ALIVE):
+        self.client = client
+        self.model = model
+        self.system_message = {'role': 'system', 'content': system_prompt}
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.keep_alive = keep_alive
+
+        # (user message, assistant message) pairs, oldest first
+        self.turns = []
+        self.lock = threading.Lock()
+
+    def history_tokens(self):
+        return sum(estimate_tokens(m['content']) for turn in self.turns for m in turn)
+
+    def messages(self, user_text):
+        history = [m for turn in self.turns for m in turn]
+        return [self.system_message] + history + [{'role': 'user', 'content': user_text}]
+
+    def warm_up(self):
+        """Load the model and evaluate the system prompt ahead of the first turn"""
+        try:
+            self.client.chat(model=self.model, messages=[self.system_message],
+                             keep_alive=self.keep_alive, options={'num_predict': 1})
+        except Exception as e:
+            print(f"Conversation warm-up failed: {e}")
+
+    def stream_reply(self, user_text, context=None):
+        """Yield reply chunks for a user turn, recording the turn once it completes.
+
+        context (e.g. recalled notes) is put in front of the user's text and
+        kept in the history as sent, so the cached prefix stays valid.
+        """
+        if context:
+            user_text = f"{context}\n\n{user_text}"
+        with self.lock:
+            messages = self.messages(user_text)
+
+        reply = ""
+        for chunk in self.client.chat(model=self.model, messages=messages,
+                                      stream=True, keep_alive=self.keep_alive):
+            reply += chunk['message']['content']
+            yield chunk['message']['content']
+
+        with self.lock:
+            self.turns.append((
+                {'role': 'user', 'content': user_text},
+                {'role': 'assistant', 'content': reply},
+            ))
+            self._trim()
+
+    def _trim(self):
+        if len(self.turns) <= self.max_turns and self.history_tokens() <= self.token_budget:
+            return
+        while self.turns and (len(self.turns) > self.max_turns // 2
+                              or self.history_tokens() > self.token_budget // 2):
+            self.turns.pop(0)
+
+    def reset(self):
+        with self.lock:
+            self.turns = []
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import threading
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_INTERVAL = 15
+
+
+class EventBroker:
+    """Fan server events out to every connected Server-Sent Events client.
+
+    publish() is safe to call from any thread; delivery happens on the
+    event loop. Each subscriber has a bounded queue, and a client that
+    falls behind loses its oldest events rather than stalling the others.
+    Subscribers are held in this process, so with several uvicorn workers
+    a client only sees events published by its own worker.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.loop = None
+        self.loop_thread = None
+
+    def bind(self, loop):
+        """Attach to the event loop that serves the SSE streams"""
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+
+    def publish(self, event, data):
+        if self.loop is None or not self.subscribers:
+            return
+        if threading.get_ident() == self.loop_thread:
+            self._deliver(event, data)
+        else:
+            self.loop.call_soon_threadsafe(self._deliver, event, data)
+
+    def _deliver(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def stream(self, request):
+        """Yield SSE messages for one client until it disconnects"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers.add(queue)
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self.subscribers.discard(queue)
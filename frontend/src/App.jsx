@@ -13,14 +13,17 @@ function App() {
   const [keyPressed, setKeyPressed] = useState('');
   const [isSpeaking, setIsSpeaking] = useState(false);
   const [summary, setSummary] = useState('');
+  const [partialText, setPartialText] = useState('');
 
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
   const streamRef = useRef(null);
+  const socketRef = useRef(null);
   const spacebarPressedRef = useRef(false);
 
   // API base URL - use relative URL to leverage nginx proxy
   const API_BASE = '/api';
+  const WS_BASE = `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}/ws`;
 
   // Initialize and get initial data
   useEffect(() => {
@@ -28,6 +31,24 @@ function App() {
     fetchStatus();
   }, []);
 
+  // Server push for notes and mode changes (keeps open tabs in sync)
+  useEffect(() => {
+    const events = new EventSource(`${API_BASE}/events`);
+
+    events.addEventListener('note-saved', (event) => {
+      const data = JSON.parse(event.data);
+      setNotesCount(data.notes_count);
+      fetchNotes();
+    });
+
+    events.addEventListener('mode-changed', (event) => {
+      const data = JSON.parse(event.data);
+      setMode(data.note_mode ? 'note' : 'assistant');
+    });
+
+    return () => events.close();
+  }, []);
+
   // Set up keyboard listeners
   useEffect(() => {
     const handleKeyDown = (e) => {
@@ -96,15 +117,23 @@ function App() {
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
 
+      // Stream audio to the backend while recording
+      const socket = openTranscribeSocket();
+      socketRef.current = socket;
+
       // Collect audio data
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunksRef.current.push(event.data);
+          if (socket.readyState === WebSocket.OPEN) {
+            socket.send(event.data);
+          }
         }
       };
 
-      // Start recording
-      mediaRecorder.start();
+      // Start recording, emitting a chunk every 250ms
+      mediaRecorder.start(250);
+      setPartialText('');
       setRecording(true);
       setMessage('Recording...');
       setStatus('recording');
@@ -128,8 +157,18 @@ function App() {
           streamRef.current.getTracks().forEach(track => track.stop());
         }
 
-        // Send to backend
-        await uploadAudio(audioBlob);
+        const socket = socketRef.current;
+        if (socket && socket.readyState === WebSocket.OPEN) {
+          // Audio is already on the server - just ask it to finalize
+          socket.onclose = (event) => {
+            if (!event.wasClean) uploadAudio(audioBlob);
+          };
+          socket.send(JSON.stringify({ type: 'stop' }));
+        } else {
+          // Streaming unavailable - fall back to a one-shot upload
+          if (socket) socket.close();
+          await uploadAudio(audioBlob);
+        }
       };
 
       mediaRecorderRef.current.stop();
@@ -137,6 +176,47 @@ function App() {
     }
   };
 
+  const openTranscribeSocket = () => {
+    const socket = new WebSocket(`${WS_BASE}/transcribe`);
+
+    socket.onopen = () => {
+      // Send whatever was recorded before the connection was ready
+      audioChunksRef.current.forEach((chunk) => socket.send(chunk));
+    };
+
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type === 'partial') {
+        setPartialText(data.text);
+      } else if (data.type === 'final') {
+        socket.onclose = null;
+        if (data.retry) {
+          // Server is busy - upload the whole clip when recording stops instead
+          if (socketRef.current === socket) socketRef.current = null;
+          return;
+        }
+        handleTranscriptionResult(data);
+      }
+    };
+
+    return socket;
+  };
+
+  const handleTranscriptionResult = (data) => {
+    setPartialText('');
+    if (data.status === 'noted') {
+      setMessage('✅ NOTED!');
+      setStatus('noted');
+      setTimeout(() => {
+        setStatus('idle');
+        setMessage('');
+      }, 2000);
+    } else {
+      setMessage(data.message || 'Error processing audio');
+      setStatus('error');
+    }
+  };
+
   const uploadAudio = async (audioBlob) => {
     try {
       const formData = new FormData();
@@ -148,18 +228,7 @@ function App() {
         },
       });
 
-      if (response.data.status === 'noted') {
-        setMessage('✅ NOTED!');
-        setStatus('noted');
-        setTimeout(() => {
-          setStatus('idle');
-          setMessage('');
-        }, 2000);
-        fetchNotes();
-      } else {
-        setMessage(response.data.message || 'Error processing audio');
-        setStatus('error');
-      }
+      handleTranscriptionResult(response.data);
 
     } catch (error) {
       console.error('Error uploading audio:', error);
@@ -207,7 +276,6 @@ function App() {
         });
         setMessage('Note added successfully!');
         setManualNote('');
-        fetchNotes();
       } catch (error) {
         console.error('Error adding manual note:', error);
       }
@@ -218,37 +286,81 @@ function App() {
     try {
       setMessage('Summarizing your notes...');
       setIsSpeaking(true);
+      setSummary('');
 
-      // Call backend to get summary from Ollama
-      const response = await axios.get(`${API_BASE}/summarize-notes`);
+      // Stream the summary from Ollama and read each sentence as it arrives
+      const response = await fetch(`${API_BASE}/summarize-notes?stream=true`);
 
-      if (response.data.status === 'success') {
-        const summaryText = response.data.summary;
-        setSummary(summaryText);
-        setMessage('Reading summary...');
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
 
-        // Use Web Speech API to speak the summary
-        const utterance = new SpeechSynthesisUtterance(summaryText);
+      if ((response.headers.get('content-type') || '').includes('application/json')) {
+        // No notes (or an error) - the backend answers with JSON instead of a stream
+        const data = await response.json();
+        setMessage(data.message || 'No notes to summarize');
+        setIsSpeaking(false);
+        return;
+      }
+
+      let pendingUtterances = 0;
+      let streamDone = false;
+
+      const finishIfDone = () => {
+        if (streamDone && pendingUtterances === 0) {
+          setIsSpeaking(false);
+          setMessage('');
+        }
+      };
+
+      const speakSentence = (sentence) => {
+        // Use Web Speech API to speak the summary (utterances queue up in order)
+        const utterance = new SpeechSynthesisUtterance(sentence);
         utterance.rate = 0.9; // Slightly slower for clarity
         utterance.pitch = 1.0;
         utterance.volume = 1.0;
 
         utterance.onend = () => {
-          setIsSpeaking(false);
-          setMessage('');
+          pendingUtterances -= 1;
+          finishIfDone();
         };
 
         utterance.onerror = (event) => {
           console.error('Speech synthesis error:', event);
-          setIsSpeaking(false);
-          setMessage('Error reading summary');
+          pendingUtterances -= 1;
+          finishIfDone();
         };
 
+        pendingUtterances += 1;
         window.speechSynthesis.speak(utterance);
-      } else {
-        setMessage(response.data.message || 'No notes to summarize');
-        setIsSpeaking(false);
+      };
+
+      setMessage('Reading summary...');
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let fullText = '';
+      let pending = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        const chunk = decoder.decode(value, { stream: true });
+        fullText += chunk;
+        pending += chunk;
+        setSummary(fullText);
+
+        // Speak every complete sentence, keep the unfinished tail
+        const parts = pending.split(/(?<=[.!?])\s+/);
+        pending = parts.pop();
+        parts.filter((part) => part.trim()).forEach(speakSentence);
+      }
+
+      if (pending.trim()) {
+        speakSentence(pending.trim());
       }
+      streamDone = true;
+      finishIfDone();
     } catch (error) {
       console.error('Error reading notes:', error);
       setMessage('Error: Could not summarize notes');
@@ -327,6 +439,7 @@ function App() {
                 <span className="wave" style={{animationDelay: '0.2s'}}>🌊</span>
                 <span className="wave" style={{animationDelay: '0.4s'}}>🌊</span>
               </div>
+              {partialText && <p>{partialText}</p>}
               <p><em>Click STOP or release SPACEBAR</em></p>
             </div>
           ) : (
@@ -0,0 +1,102 @@
+import re
+from collections import namedtuple
+
+# Phrases that turn an utterance into a note
+NOTE_TRIGGERS = ['note this', 'note that', 'take a note', 'remember this', 'remember that',
+                 'add note', 'save note', 'write down', 'jot down']
+
+# Words that mark a development task for Claude Code
+COMMAND_WORDS = ['create', 'make', 'write', 'run', 'execute', 'build', 'install', 'delete', 'remove']
+
+# Leading words stripped from the note text after a trigger
+NOTE_FILLERS = ['that', 'to', ':', '-']
+
+# kind is 'note', 'command' or 'chat'; span is the (start, end) of the
+# matched trigger; payload is the note text for notes, else the full text
+Intent = namedtuple('Intent', ['kind', 'trigger', 'span', 'payload'])
+
+
+def _trie_pattern(phrases):
+    """Regex for a phrase list with shared prefixes factored out, e.g.
+    ['note this', 'note that'] -> 'note\\s+th(?:at|is)', so the engine
+    walks each candidate position once instead of trying every phrase.
+    """
+    root = {}
+    for phrase in phrases:
+        node = root
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [(r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if '' in node else group
+
+    return build(root)
+
+
+def _intent_pattern(flags=0):
+    # A lookahead on the possible first letters skips most positions cheaply.
+    # At any position a note trigger wins over a command word ("write down"
+    # vs "write"). Note triggers must be whole words; command words only
+    # need to start a word ("running", "builds").
+    first_letters = ''.join(sorted({p[0] for p in NOTE_TRIGGERS + COMMAND_WORDS}))
+    return re.compile(
+        rf'\b(?=[{first_letters}])'
+        rf'(?:(?P<note>{_trie_pattern(NOTE_TRIGGERS)})\b|(?P<command>{_trie_pattern(COMMAND_WORDS)}))',
+        flags,
+    )
+
+
+# Matched against lowercased text; the case-insensitive variant covers the
+# rare strings whose length changes when lowercased
+INTENT_PATTERN = _intent_pattern()
+INTENT_PATTERN_IGNORECASE = _intent_pattern(re.IGNORECASE)
+
+# Each filler is stripped at most once, in list order, so "note this: to be
+# or not to be" keeps its "to". A word followed by a hyphen ("to-do") is content.
+FILLER_PATTERN = re.compile(
+    r'^\s*' + ''.join(
+        rf'(?:{re.escape(f)}\b(?!-)\s*)?' if f.isalpha() else rf'(?:{re.escape(f)}\s*)?'
+        for f in NOTE_FILLERS
+    ),
+    re.IGNORECASE,
+)
+
+
+def _note_payload(text, end):
+    """Text after the trigger with leading filler words removed"""
+    note = text[end:].strip()
+    note = note[FILLER_PATTERN.match(note).end():].strip()
+    return note if note else text
+
+
+def classify(text):
+    """Route an utterance in a single scan.
+
+    A note trigger anywhere in the text beats a command word, matching the
+    order the assistants have always checked them in.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        matches = INTENT_PATTERN.finditer(lowered)
+    else:
+        matches = INTENT_PATTERN_IGNORECASE.finditer(text)
+
+    command = None
+    for match in matches:
+        if match.lastgroup == 'note':
+            return Intent('note', match.group().lower(), match.span(), _note_payload(text, match.end()))
+        if command is None:
+            command = match
+
+    if command is not None:
+        return Intent('command', command.group().lower(), command.span(), text)
+    return Intent('chat', None, None, text)
+
@@ -0,0 +1,156 @@
+import audioop
+import collections
+import os
+import queue
+import threading
+
+import speech_recognition as sr
+
+# Segmenter tuning, all in seconds except the ratios
+LISTEN_PRE_ROLL = float(os.getenv('LISTEN_PRE_ROLL', '0.3'))
+LISTEN_HANGOVER = float(os.getenv('LISTEN_HANGOVER', '0.7'))
+LISTEN_MIN_SPEECH = float(os.getenv('LISTEN_MIN_SPEECH', '0.25'))
+LISTEN_MAX_UTTERANCE = float(os.getenv('LISTEN_MAX_UTTERANCE', '10'))
+LISTEN_CALIBRATION = float(os.getenv('LISTEN_CALIBRATION', '0.5'))
+# Speech must be this many times louder than the noise floor
+LISTEN_THRESHOLD_RATIO = float(os.getenv('LISTEN_THRESHOLD_RATIO', '3.0'))
+LISTEN_MIN_THRESHOLD = float(os.getenv('LISTEN_MIN_THRESHOLD', '300'))
+# How quickly the noise floor follows the room while nobody is talking
+LISTEN_NOISE_ADAPT = float(os.getenv('LISTEN_NOISE_ADAPT', '0.05'))
+# Extra threshold factor while the assistant is talking, so its own voice
+# from the speakers doesn't count but the user talking over it does
+LISTEN_BARGE_IN_RATIO = float(os.getenv('LISTEN_BARGE_IN_RATIO', '2.0'))
+
+
+class ContinuousListener:
+    """Keeps one microphone stream open and cuts it into utterances.
+
+    A capture thread reads the mic continuously and runs a cheap energy
+    detector on each chunk: a chunk is speech when its RMS clears a
+    multiple of the noise floor. An utterance starts on the first speech
+    chunk (prefixed with a short ring buffer of pre-roll audio so the
+    first syllable isn't clipped) and ends after a hangover of silence.
+    Finished utterances go onto a queue as sr.AudioData.
+
+    The noise floor is measured once when the listener first starts and
+    then tracked with a moving average over non-speech chunks, so later
+    starts and back-to-back commands skip calibration entirely.
+    """
+
+    def __init__(self, on_level=None, on_speech_start=None, sample_rate=16000):
+        self.on_level = on_level
+        self.on_speech_start = on_speech_start
+        self.sample_rate = sample_rate
+
+        self.utterances = queue.Queue()
+        self.noise_floor = None
+        self.ducked = threading.Event()
+        self._stop = threading.Event()
+        self._flush = False
+        self._thread = None
+
+    @property
+    def threshold(self):
+        if self.noise_floor is None:
+            threshold = LISTEN_MIN_THRESHOLD
+        else:
+            threshold = max(LISTEN_MIN_THRESHOLD, self.noise_floor * LISTEN_THRESHOLD_RATIO)
+        if self.ducked.is_set():
+            threshold *= LISTEN_BARGE_IN_RATIO
+        return threshold
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            if not self._stop.is_set():
+                return
+            # A stop is still winding down; let it release the mic first
+            self._thread.join()
+        self._stop.clear()
+        self._flush = False
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=False):
+        """Release the mic; with flush, an utterance cut off mid-speech is still queued"""
+        self._flush = flush
+        self._stop.set()
+
+    def duck(self):
+        """Raise the threshold while the assistant is talking"""
+        self.ducked.set()
+
+    def unduck(self):
+        self.ducked.clear()
+
+    def get(self, timeout=None):
+        """Next utterance as sr.AudioData; None marks the capture thread exiting"""
+        return self.utterances.get(timeout=timeout)
+
+    def _calibrate(self, source, chunk_seconds):
+        levels = []
+        for _ in range(max(1, int(LISTEN_CALIBRATION / chunk_seconds))):
+            levels.append(audioop.rms(source.stream.read(source.CHUNK), source.SAMPLE_WIDTH))
+        self.noise_floor = sum(levels) / len(levels)
+
+    def _capture(self):
+        try:
+            with sr.Microphone(sample_rate=self.sample_rate) as source:
+                self._segment(source)
+        except Exception as e:
+            print(f"Microphone error: {e}")
+        finally:
+            self.utterances.put(None)
+
+    def _segment(self, source):
+        width = source.SAMPLE_WIDTH
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        if self.noise_floor is None:
+            self._calibrate(source, chunk_seconds)
+
+        pre_roll = collections.deque(maxlen=max(1, int(LISTEN_PRE_ROLL / chunk_seconds)))
+        hangover_chunks = max(1, int(LISTEN_HANGOVER / chunk_seconds))
+        min_chunks = max(1, int(LISTEN_MIN_SPEECH / chunk_seconds))
+        max_chunks = int(LISTEN_MAX_UTTERANCE / chunk_seconds)
+
+        frames = []
+        speech_chunks = 0
+        silent_run = 0
+
+        while not self._stop.is_set():
+            chunk = source.stream.read(source.CHUNK)
+            rms = audioop.rms(chunk, width)
+            if self.on_level:
+                self.on_level(min(rms / 3000, 1.0))
+            is_speech = rms > self.threshold
+
+            if not frames:
+                if not is_speech:
+                    # Playback isn't room noise
+                    if not self.ducked.is_set():
+                        self.noise_floor += LISTEN_NOISE_ADAPT * (rms - self.noise_floor)
+                    pre_roll.append(chunk)
+                    continue
+                frames = list(pre_roll)
+                pre_roll.clear()
+                if self.on_speech_start:
+                    self.on_speech_start()
+
+            frames.append(chunk)
+            if is_speech:
+                speech_chunks += 1
+                silent_run = 0
+            else:
+                silent_run += 1
+
+            if silent_run >= hangover_chunks or len(frames) >= max_chunks:
+                # Drop clicks and coughs too short to be a command
+                if speech_chunks >= min_chunks:
+                    self.utterances.put(sr.AudioData(b''.join(frames), source.SAMPLE_RATE, width))
+                frames, speech_chunks, silent_run = [], 0, 0
+
+        if self._flush and speech_chunks >= min_chunks:
+            self.utterances.put(sr.AudioData(b''.join(frames), source.SAMPLE_RATE, width))
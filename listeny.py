@@ -1,16 +1,70 @@
 import tkinter as tk
 from tkinter import Canvas
 import speech_recognition as sr
-import pyttsx3
 import ollama
-import subprocess
 import threading
-import time
-import math
 import random
+from array import array
 import os
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from speech_engine import get_engine
+from note_store import NoteStore
+from conversation import ConversationSession
+from intents import classify
+from claude_runner import ClaudeExecutor
+from listener import ContinuousListener
+from recall import RecallIndex
+from tts_worker import TTSWorker, PRIORITY_HIGH, PRIORITY_NORMAL, split_sentences
+import metrics
+from metrics import ERRORS, STAGE_SECONDS, record_error, track
+
+SYSTEM_PROMPT = """You are Listeny, a voice-activated AI assistant for Aditya. You help with tasks, manage projects, and execute commands through voice interaction.
+
+## Capabilities:
+- Voice-controlled AI assistant using speech recognition and text-to-speech
+- Access to Ollama AI model (gpt-oss:20b) for intelligent responses
+- Integration with Claude Code for executing development tasks
+- File system operations and project management
+- Code generation, debugging, and refactoring
+- System command execution through Claude Code
+
+## Tools Available:
+1. **Claude Code Integration**: Can execute commands like 'create file', 'write code', 'run tests', 'build project', etc. using --dangerously-skip-permissions mode
+2. **Ollama AI**: Advanced reasoning and conversation capabilities
+3. **File System**: Read, write, modify files and directories
+4. **Speech Recognition**: Convert voice to text commands
+5. **Text-to-Speech**: Provide verbal responses
+6. **Daily Notes**: Take and save notes to daily markdown files in the notes/ folder
+
+## Command Examples:
+- "Create a new Python file called app.py"
+- "Run the tests for this project" 
+- "Build and deploy the application"
+- "Refactor this code to be more efficient"
+- "Install these dependencies"
+- "Check the git status"
+- "Write documentation for this module"
+
+## Note-Taking Commands:
+- "Note this: meeting with team at 3pm"
+- "Remember that I need to review the PR"
+- "Take a note: call client tomorrow"
+- "Write down: deadline is Friday"
+- "Jot down: buy groceries after work"
+
+## Behavior:
+- Always respond as Listeny, Aditya's personal assistant
+- Be helpful, concise, and action-oriented
+- For development tasks, leverage Claude Code execution
+- Provide clear verbal feedback on actions taken
+- Ask for clarification if commands are ambiguous
+- Prioritize security and safety in all operations
+
+Current working directory: /Users/adityakarnam/Projects/listen.me"""
+
+# Wave animation: fixed pool of canvas items, 20 fps
+MAX_WAVES = 16
+FRAME_MS = 50
+CENTER_X, CENTER_Y = 150, 150
 
 class Listeny:
     def __init__(self):
@@ -20,13 +74,19 @@ class Listeny:
         self.root.configure(bg='#1a1a1a')
         
         # Initialize components
-        self.recognizer = sr.Recognizer()
-        self.tts_engine = pyttsx3.init()
+        self.speech_engine = get_engine()
         self.ollama_client = ollama.Client(host='http://192.168.40.69:11434/')
+        self.conversation = ConversationSession(self.ollama_client, 'gpt-oss:20b', SYSTEM_PROMPT)
+        self.claude = ClaudeExecutor()
+        # Speech output ducks the mic; the user talking over it cancels it (barge-in)
+        self.listener = ContinuousListener(on_level=self.update_mic_level, on_speech_start=self.barge_in)
+        self.tts = TTSWorker(on_busy=self.listener.duck, on_idle=self.listener.unduck)
         
         # Notes directory
         self.notes_dir = os.path.join(os.path.dirname(__file__), 'notes')
         os.makedirs(self.notes_dir, exist_ok=True)
+        self.note_store = NoteStore(self.notes_dir, heading="Aditya's Daily Notes")
+        self.recall = RecallIndex(self.note_store, os.path.join(self.notes_dir, '.cache', 'embeddings'), self.ollama_client)
         
         # UI elements
         self.canvas = Canvas(self.root, width=300, height=300, bg='#1a1a1a', highlightthickness=0)
@@ -35,16 +95,35 @@ class Listeny:
         self.status_label = tk.Label(self.root, text="Click to start listening", fg='white', bg='#1a1a1a', font=('Arial', 12))
         self.status_label.pack()
         
-        # Wave animation variables
-        self.waves = []
+        # Wave animation: items are created once and only moved/recolored per frame
+        self.wave_items = [
+            self.canvas.create_oval(0, 0, 0, 0, outline='#000000', width=2, state='hidden')
+            for _ in range(MAX_WAVES)
+        ]
+        self.center_item = self.canvas.create_oval(130, 130, 170, 170, fill='#4a90e2', outline='white', width=2, state='hidden')
+        self.wave_radius = array('f', [0.0] * MAX_WAVES)
+        self.wave_opacity = array('f', [0.0] * MAX_WAVES)
+        self.wave_colors = [None] * MAX_WAVES
+        self.mic_level = 0.0
         self.animating = False
         self.listening = False
         
-        # Canvas click event
+        # Canvas click event; Escape cancels running Claude Code commands
         self.canvas.bind('<Button-1>', self.toggle_listening)
+        self.root.bind('<Escape>', self.cancel_claude)
         
         # Welcome message
-        threading.Thread(target=self.speak, args=("Hello I am listeny here to listen",), daemon=True).start()
+        self.speak("Hello I am listeny here to listen", cache=True)
+        
+        # Load the model and cache the system prompt before the first question
+        threading.Thread(target=self.conversation.warm_up, daemon=True).start()
+        
+        # Optional Prometheus endpoint (METRICS_PORT) for the same stage metrics as the backend
+        if metrics.METRICS_PORT:
+            metrics.serve(metrics.METRICS_PORT)
+        
+        # Handles utterances cut by the listener, one at a time
+        threading.Thread(target=self.process_utterances, daemon=True).start()
         
     def toggle_listening(self, event):
         if not self.listening:
@@ -57,239 +136,208 @@ class Listeny:
         self.status_label.config(text="Listening...")
         self.start_wave_animation()
         
-        # Start listening in separate thread
-        threading.Thread(target=self.listen_and_process, daemon=True).start()
+        # The mic stays open until the next click; each pause ends an utterance
+        self.listener.start()
     
     def stop_listening(self):
         self.listening = False
-        self.status_label.config(text="Processing...")
+        self.listener.stop()
+        self.status_label.config(text="Click to start listening")
         self.stop_wave_animation()
     
+    def set_status(self, text):
+        self.root.after(0, lambda: self.status_label.config(text=text))
+    
+    def idle_status(self):
+        return "Listening..." if self.listening else "Click to start listening"
+    
     def start_wave_animation(self):
+        if self.animating:
+            return
         self.animating = True
+        self.canvas.itemconfigure(self.center_item, state='normal')
         self.animate_waves()
     
     def stop_wave_animation(self):
         self.animating = False
-        self.canvas.delete("all")
-        self.waves = []
+        self.mic_level = 0.0
+        for i, item in enumerate(self.wave_items):
+            self.wave_opacity[i] = 0.0
+            self.canvas.itemconfigure(item, state='hidden')
+        self.canvas.itemconfigure(self.center_item, state='hidden')
+    
+    def update_mic_level(self, level):
+        """Called from the audio thread with each chunk's normalized RMS"""
+        self.mic_level = 0.7 * self.mic_level + 0.3 * level
     
     def animate_waves(self):
         if not self.animating:
             return
         
-        self.canvas.delete("all")
-        
-        # Add new wave occasionally
-        if random.random() < 0.1:
-            self.waves.append({'radius': 10, 'opacity': 1.0})
+        level = self.mic_level
+        radius, opacity = self.wave_radius, self.wave_opacity
         
-        # Update and draw waves
-        center_x, center_y = 150, 150
-        waves_to_remove = []
+        # Louder input spawns waves more often
+        if random.random() < 0.05 + 0.4 * level:
+            for i in range(MAX_WAVES):
+                if opacity[i] <= 0:
+                    radius[i] = 10
+                    opacity[i] = 1.0
+                    break
         
-        for i, wave in enumerate(self.waves):
-            wave['radius'] += 3
-            wave['opacity'] -= 0.02
+        # Move and fade live waves in place
+        for i, item in enumerate(self.wave_items):
+            if opacity[i] <= 0:
+                continue
+            radius[i] += 3 + 3 * level
+            opacity[i] -= 0.02
             
-            if wave['opacity'] <= 0:
-                waves_to_remove.append(i)
-            else:
-                color_intensity = int(100 * wave['opacity'])
-                color = f'#{color_intensity:02x}{color_intensity+50:02x}{255:02x}'
-                self.canvas.create_oval(
-                    center_x - wave['radius'], center_y - wave['radius'],
-                    center_x + wave['radius'], center_y + wave['radius'],
-                    outline=color, width=2
-                )
-        
-        # Remove dead waves
-        for i in reversed(waves_to_remove):
-            self.waves.pop(i)
+            if opacity[i] <= 0:
+                self.canvas.itemconfigure(item, state='hidden')
+                self.wave_colors[i] = None
+                continue
+            
+            r = radius[i]
+            self.canvas.coords(item, CENTER_X - r, CENTER_Y - r, CENTER_X + r, CENTER_Y + r)
+            color_intensity = int(100 * opacity[i])
+            color = f'#{color_intensity:02x}{color_intensity+50:02x}{255:02x}'
+            if color != self.wave_colors[i]:
+                self.canvas.itemconfigure(item, outline=color, state='normal')
+                self.wave_colors[i] = color
         
-        # Draw center circle
-        self.canvas.create_oval(130, 130, 170, 170, fill='#4a90e2', outline='white', width=2)
+        # Center circle pulses with the microphone level
+        r = 20 + 10 * level
+        self.canvas.coords(self.center_item, CENTER_X - r, CENTER_Y - r, CENTER_X + r, CENTER_Y + r)
+        self.canvas.tag_raise(self.center_item)
         
-        if self.animating:
-            self.root.after(50, self.animate_waves)
+        self.root.after(FRAME_MS, self.animate_waves)
     
-    def listen_and_process(self):
+    def process_utterances(self):
+        while True:
+            audio = self.listener.get()
+            if audio is None:
+                # Capture stopped (click or mic error)
+                if self.listening:
+                    self.root.after(0, self.stop_listening)
+                continue
+            self.process_utterance(audio)
+    
+    def process_utterance(self, audio):
         try:
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            
-            # Stop listening animation
-            self.root.after(0, self.stop_listening)
+            self.set_status("Processing...")
             
             # Convert speech to text
-            text = self.recognizer.recognize_google(audio)
+            with track('recognize'):
+                text = self.speech_engine.transcribe(audio)
             print(f"Recognized: {text}")
             
-            # Check for note command first
-            if self.is_note_command(text):
-                note_content = self.extract_note(text)
-                self.save_note(note_content)
-                response = f"Got it, I've noted that down for you."
+            # Route in one pass - note commands win over development tasks
+            intent = classify(text)
+            if intent.kind == 'note':
+                with track('save'):
+                    self.save_note(intent.payload)
+                self.speak("Got it, I've noted that down for you.", priority=PRIORITY_HIGH, cache=True)
             # Execute with Claude Code if needed
-            elif self.should_execute_with_claude(text):
-                result = self.execute_with_claude(text)
-                response = f"Executed: {result}"
+            elif intent.kind == 'command':
+                self.execute_with_claude(text)
+                self.speak("On it.", priority=PRIORITY_HIGH, cache=True)
             else:
-                # Process with Ollama
-                response = self.get_ollama_response(text)
+                # Process with Ollama, speaking each sentence as soon as it's complete.
+                # Sentences still arriving after a barge-in are dropped with the rest.
+                generation = self.tts.generation
+                with track('llm'):
+                    response = self.get_ollama_response(
+                        text, on_sentence=lambda sentence: self.tts.say(sentence, generation=generation))
                 print(f"AI Response: {response}")
             
-            # Speak response
-            threading.Thread(target=self.speak, args=(response,), daemon=True).start()
-            
             # Reset UI
-            self.root.after(1000, lambda: self.status_label.config(text="Click to start listening"))
+            self.set_status(self.idle_status())
             
-        except sr.WaitTimeoutError:
-            self.root.after(0, lambda: self.status_label.config(text="Timeout - Click to try again"))
-            self.listening = False
-            self.stop_wave_animation()
         except sr.UnknownValueError:
-            self.root.after(0, lambda: self.status_label.config(text="Didn't understand - Click to try again"))
-            self.listening = False
-            self.stop_wave_animation()
+            self.set_status("Didn't understand - " + self.idle_status())
         except Exception as e:
+            record_error('utterance', e)
             print(f"Error: {e}")
-            self.root.after(0, lambda: self.status_label.config(text="Error - Click to try again"))
-            self.listening = False
-            self.stop_wave_animation()
+            self.set_status("Error - " + self.idle_status())
     
-    def get_ollama_response(self, text):
+    def get_ollama_response(self, text, on_sentence=None):
+        """Stream a reply from Ollama, handing each finished sentence to on_sentence"""
         try:
-            system_prompt = """You are Listeny, a voice-activated AI assistant for Aditya. You help with tasks, manage projects, and execute commands through voice interaction.
+            response = ""
+            pending = ""
+            for chunk in self.conversation.stream_reply(text, context=self.recall_context(text)):
+                response += chunk
+                pending += chunk
+                sentences, pending = split_sentences(pending)
+                if on_sentence:
+                    for sentence in sentences:
+                        on_sentence(sentence)
 
-## Capabilities:
-- Voice-controlled AI assistant using speech recognition and text-to-speech
-- Access to Ollama AI model (gpt-oss:20b) for intelligent responses
-- Integration with Claude Code for executing development tasks
-- File system operations and project management
-- Code generation, debugging, and refactoring
-- System command execution through Claude Code
-
-## Tools Available:
-1. **Claude Code Integration**: Can execute commands like 'create file', 'write code', 'run tests', 'build project', etc. using --dangerously-skip-permissions mode
-2. **Ollama AI**: Advanced reasoning and conversation capabilities
-3. **File System**: Read, write, modify files and directories
-4. **Speech Recognition**: Convert voice to text commands
-5. **Text-to-Speech**: Provide verbal responses
-6. **Daily Notes**: Take and save notes to daily markdown files in the notes/ folder
-
-## Command Examples:
-- "Create a new Python file called app.py"
-- "Run the tests for this project" 
-- "Build and deploy the application"
-- "Refactor this code to be more efficient"
-- "Install these dependencies"
-- "Check the git status"
-- "Write documentation for this module"
-
-## Note-Taking Commands:
-- "Note this: meeting with team at 3pm"
-- "Remember that I need to review the PR"
-- "Take a note: call client tomorrow"
-- "Write down: deadline is Friday"
-- "Jot down: buy groceries after work"
-
-## Behavior:
-- Always respond as Listeny, Aditya's personal assistant
-- Be helpful, concise, and action-oriented
-- For development tasks, leverage Claude Code execution
-- Provide clear verbal feedback on actions taken
-- Ask for clarification if commands are ambiguous
-- Prioritize security and safety in all operations
-
-Current working directory: /Users/adityakarnam/Projects/listen.me"""
-            
-            full_prompt = f"{system_prompt}\n\nUser: {text}\n\nListeny:"
-            response = self.ollama_client.generate(
-                model='gpt-oss:20b',
-                prompt=full_prompt
-            )
-            return response['response']
+            if on_sentence and pending.strip():
+                on_sentence(pending.strip())
+            return response
         except Exception as e:
-            return f"Error getting AI response: {str(e)}"
+            record_error('llm', e)
+            error = f"Error getting AI response: {str(e)}"
+            if on_sentence:
+                on_sentence(error)
+            return error
     
-    def is_note_command(self, text):
-        """Check if the command is a note-taking request"""
-        note_triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        text_lower = text.lower()
-        return any(trigger in text_lower for trigger in note_triggers)
-    
-    def extract_note(self, text):
-        """Extract the actual note content from the command"""
-        text_lower = text.lower()
-        # Remove trigger phrases to get the actual note
-        triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        note = text
-        for trigger in triggers:
-            if trigger in text_lower:
-                idx = text_lower.find(trigger) + len(trigger)
-                note = text[idx:].strip()
-                # Remove common filler words at the start
-                for filler in ['that', 'to', ':', '-']:
-                    if note.lower().startswith(filler):
-                        note = note[len(filler):].strip()
-                break
-        return note if note else text
+    def recall_context(self, text):
+        """Notes related to what was asked, for the model to draw on"""
+        try:
+            with track('recall'):
+                return self.recall.context(text)
+        except Exception as e:
+            record_error('recall', e)
+            return None
     
     def save_note(self, note_content):
         """Save note to today's markdown file"""
-        chicago_tz = ZoneInfo("America/Chicago")
-        today = datetime.now(chicago_tz)
-        filename = today.strftime('%Y-%m-%d') + '.md'
-        filepath = os.path.join(self.notes_dir, filename)
-        
-        timestamp = today.strftime('%H:%M')
-        
-        # Check if file exists
-        if os.path.exists(filepath):
-            # Append to existing file
-            with open(filepath, 'a') as f:
-                f.write(f"\n- **{timestamp}**: {note_content}")
-        else:
-            # Create new file with header
-            with open(filepath, 'w') as f:
-                f.write(f"# Notes for {today.strftime('%A, %B %d, %Y')}\n\n")
-                f.write(f"## Aditya's Daily Notes\n\n")
-                f.write(f"- **{timestamp}**: {note_content}")
-        
-        print(f"Note saved to {filepath}")
-    
-    def should_execute_with_claude(self, text):
-        # Simple heuristic - if it contains command-like words
-        command_words = ['create', 'make', 'write', 'run', 'execute', 'build', 'install', 'delete', 'remove']
-        return any(word in text.lower() for word in command_words)
+        entry = self.note_store.append(note_content)
+        self.recall.add([entry])
+        print(f"Note saved to {self.note_store.markdown_path(entry['day'])}")
     
     def execute_with_claude(self, command):
-        try:
-            # Run claude code with dangerous skip permissions
-            result = subprocess.run(
-                ['claude', '--dangerously-skip-permissions', command],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            return result.stdout if result.stdout else result.stderr
-        except subprocess.TimeoutExpired:
-            return "Command timed out"
-        except Exception as e:
-            return f"Error executing command: {str(e)}"
+        """Queue a command for Claude Code without blocking the listening thread"""
+        def show_output(line):
+            if line.strip():
+                self.root.after(0, lambda: self.status_label.config(text=line.strip()[:40]))
+
+        def report(job):
+            print(f"Claude job {job.id} {job.status}: waited {job.queue_seconds:.2f}s, ran {job.run_seconds:.2f}s")
+            STAGE_SECONDS.observe(job.queue_seconds, stage='claude_queue')
+            STAGE_SECONDS.observe(job.run_seconds, stage='claude_run')
+            if job.status in ('timeout', 'error'):
+                ERRORS.inc(stage='claude', type=job.status)
+            if job.status == 'cancelled':
+                return
+            result = job.result or "Done, with no output."
+            self.speak(f"Executed: {result}")
+            self.root.after(3000, lambda: self.status_label.config(text=self.idle_status()))
+
+        return self.claude.submit(command, on_output=show_output, on_done=report)
     
-    def speak(self, text):
-        try:
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        except Exception as e:
-            print(f"TTS Error: {e}")
+    def cancel_claude(self, event=None):
+        self.claude.cancel_all()
+        self.status_label.config(text="Cancelled - " + self.idle_status())
+    
+    def barge_in(self):
+        """The user started talking; stop speaking so they can be heard"""
+        if self.tts.speaking.is_set():
+            self.tts.cancel()
+    
+    def speak(self, text, priority=PRIORITY_NORMAL, cache=False):
+        """Queue text on the TTS worker; returns immediately"""
+        self.tts.say(text, priority=priority, cache=cache)
     
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.listener.stop()
+            self.tts.shutdown()
+            self.claude.shutdown()
 
 if __name__ == "__main__":
     app = Listeny()
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import ollama
+
+from metrics import Counter, Histogram
+
+# Configure Ollama client to use host from environment variable
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+
+# Concurrent requests allowed per model, requests allowed to wait for a
+# slot, and the per-request timeout (seconds; for streams, between chunks)
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv('OLLAMA_MAX_IN_FLIGHT', '2'))
+OLLAMA_MAX_QUEUE = int(os.getenv('OLLAMA_MAX_QUEUE', '16'))
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', '120'))
+
+
+LLM_SECONDS = Histogram('listeny_llm_request_seconds', 'Ollama request time once a slot is held', ['model', 'outcome'])
+LLM_WAIT_SECONDS = Histogram('listeny_llm_wait_seconds', 'Time spent waiting for an Ollama slot', ['model'])
+LLM_REJECTED = Counter('listeny_llm_rejected_total', 'Ollama requests rejected with a full queue', ['model'])
+
+
+class LLMBusy(Exception):
+    """Raised when a model's wait queue is full"""
+
+
+class ModelStats:
+    """Queue depth and outcome counters for one model"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.total_seconds / self.completed, 3) if self.completed else 0.0,
+        }
+
+
+class LLMGateway:
+    """Async access to Ollama over one pooled HTTP client, with a
+    concurrency limit per model so LLM calls never block the event loop
+    or pile up unbounded on the Ollama host.
+    """
+
+    def __init__(self, host=OLLAMA_HOST, max_in_flight=OLLAMA_MAX_IN_FLIGHT,
+                 max_queue=OLLAMA_MAX_QUEUE, timeout=OLLAMA_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        # Keep-alive connections are reused across requests
+        self.client = ollama.AsyncClient(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_in_flight * 4,
+                                max_keepalive_connections=max_in_flight * 2),
+        )
+
+        self._slots = {}
+        self._stats = {}
+
+    def _model_stats(self, model):
+        return self._stats.setdefault(model, ModelStats())
+
+    @asynccontextmanager
+    async def _slot(self, model):
+        """Wait for one of the model's in-flight slots"""
+        stats = self._model_stats(model)
+        if stats.waiting >= self.max_queue:
+            stats.rejected += 1
+            LLM_REJECTED.inc(model=model)
+            raise LLMBusy(f"Too many queued requests for {model} ({stats.waiting} waiting)")
+
+        semaphore = self._slots.setdefault(model, asyncio.Semaphore(self.max_in_flight))
+        stats.waiting += 1
+        queued = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        LLM_WAIT_SECONDS.observe(time.perf_counter() - queued, model=model)
+
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield
+            stats.completed += 1
+            stats.total_seconds += time.perf_counter() - started
+            LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome='ok')
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome='timeout')
+            raise
+        except Exception:
+            stats.errors += 1
+            LLM_SECONDS.observe(time.perf_counter() - started, model=model, outcome='error')
+            raise
+        finally:
+            stats.in_flight -= 1
+            semaphore.release()
+
+    async def chat(self, model, messages, **kwargs):
+        """Return the full chat reply text"""
+        async with self._slot(model):
+            response = await asyncio.wait_for(
+                self.client.chat(model=model, messages=messages, **kwargs),
+                timeout=self.timeout,
+            )
+        return response['message']['content']
+
+    async def chat_stream(self, model, messages, **kwargs):
+        """Yield chat reply text chunks as the model generates them"""
+        async with self._slot(model):
+            stream = await asyncio.wait_for(
+                self.client.chat(model=model, messages=messages, stream=True, **kwargs),
+                timeout=self.timeout,
+            )
+            iterator = stream.__aiter__()
+            while True:
+                try:
+                    part = await asyncio.wait_for(iterator.__anext__(), timeout=self.timeout)
+                except StopAsyncIteration:
+                    break
+                yield part['message']['content']
+
+    def stats(self):
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "models": {model: stats.as_dict() for model, stats in self._stats.items()},
+        }
@@ -0,0 +1,236 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port for the standalone /metrics server used by the desktop app (unset = off)
+METRICS_PORT = os.getenv('METRICS_PORT')
+
+# Histogram bucket upper bounds in seconds, from a fast decode to a slow LLM reply
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Metrics to expose, rendered in the Prometheus text format.
+
+    Collectors are callbacks run just before rendering, for gauges that
+    are cheaper to read from existing stats on scrape than to keep up to
+    date on every change.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, callback):
+        with self.lock:
+            self.collectors.append(callback)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base for a metric family with a fixed set of label names"""
+
+    type = 'untyped'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        return _format_labels(list(zip(self.labelnames, key)) + list(extra))
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{self._labels(key)} {_format_value(value)}' for key, value in items]
+
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. errors by type"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values (seconds) over fixed buckets"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self.values.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{self._labels(key, [("le", _format_value(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{self._labels(key)} {count}')
+        return lines
+
+
+# Hooks shared by the backend and the desktop app
+STAGE_SECONDS = Histogram('listeny_stage_seconds', 'Time spent in each pipeline stage', ['stage'])
+ERRORS = Counter('listeny_errors_total', 'Errors by pipeline stage and exception type', ['stage', 'type'])
+IN_FLIGHT = Gauge('listeny_in_flight', 'Work currently in progress by pipeline stage', ['stage'])
+
+
+def observe_timings(timings):
+    """Record a StageTimer-style {stage: milliseconds} dict"""
+    for stage, ms in timings.items():
+        STAGE_SECONDS.observe(ms / 1000, stage=stage)
+
+
+def record_error(stage, error):
+    ERRORS.inc(stage=stage, type=type(error).__name__)
+
+
+@contextmanager
+def track(stage):
+    """Time a stage, count it as in flight, and count the error if it raises"""
+    IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        raise
+    finally:
+        IN_FLIGHT.dec(stage=stage)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def serve(port, registry=REGISTRY):
+    """Serve /metrics from a background thread (for processes without a web server)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', int(port)), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
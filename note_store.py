@@ -0,0 +1,399 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Cross-process locking for the append log (not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Time zone that decides which day a note belongs to (IANA name)
+NOTES_TZ = ZoneInfo(os.getenv('LISTENY_TZ', 'America/Chicago'))
+
+# Day logs and markdown views are named by date
+DAY_FILE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.(?:md|jsonl)$')
+
+# Durability policy for committed notes:
+#   always   - fsync after every group commit
+#   interval - fsync at most every NOTES_FSYNC_INTERVAL seconds (and on close)
+#   never    - leave flushing to the OS
+NOTES_FSYNC = os.getenv('NOTES_FSYNC', 'interval')
+NOTES_FSYNC_INTERVAL = float(os.getenv('NOTES_FSYNC_INTERVAL', '1.0'))
+
+
+def parse_markdown(text):
+    """Pull note entries out of a legacy daily markdown file"""
+    entries = []
+    for line in text.split('\n'):
+        if line.startswith('- **') and '**: ' in line:
+            timestamp, content = line[4:].split('**: ', 1)
+            entries.append({'time': timestamp, 'content': content})
+        elif entries and line and not line.startswith('#'):
+            # Continuation of a multi-line note
+            entries[-1]['content'] += '\n' + line
+    return entries
+
+
+class DayIndex:
+    """Byte offset of every entry in one day's log"""
+
+    __slots__ = ('offsets', 'size')
+
+    def __init__(self):
+        self.offsets = []
+        self.size = 0
+
+
+class NoteStore:
+    """Append-only note log with an in-memory offset index per day.
+
+    Each day is stored as JSON lines in notes/.log/YYYY-MM-DD.jsonl, the
+    source of truth. The familiar notes/YYYY-MM-DD.md file is kept as a
+    rendered view and appended to on every commit. Writes from all threads
+    are queued and committed in groups by a single writer thread, so a
+    burst of notes costs one write (and at most one fsync) per day touched.
+    """
+
+    def __init__(self, notes_dir, heading="Daily Notes", tz=NOTES_TZ,
+                 fsync=NOTES_FSYNC, fsync_interval=NOTES_FSYNC_INTERVAL):
+        self.notes_dir = notes_dir
+        self.log_dir = os.path.join(notes_dir, '.log')
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        self.heading = heading
+        self.tz = tz
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        # Read side
+        self._indexes = {}
+        self._index_lock = threading.Lock()
+        # (directory mtimes, sorted days) for days()
+        self._days_cache = None
+
+        # Write side
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._unsynced = set()
+        self._last_fsync = time.monotonic()
+        self._writer = threading.Thread(target=self._write_loop, name='note-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # Paths and dates
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def day_key(self, when=None):
+        return (when or self.now()).strftime('%Y-%m-%d')
+
+    def log_path(self, day):
+        return os.path.join(self.log_dir, day + '.jsonl')
+
+    def markdown_path(self, day):
+        return os.path.join(self.notes_dir, day + '.md')
+
+    def markdown_header(self, day):
+        date = datetime.strptime(day, '%Y-%m-%d')
+        return f"# Notes for {date.strftime('%A, %B %d, %Y')}\n\n## {self.heading}\n\n"
+
+    # Writing
+
+    def append(self, content, when=None):
+        """Add one note; returns the entry once committed"""
+        return self.append_many([(content, when)])[0]
+
+    def append_many(self, items):
+        """Add several (content, when) notes in one group commit, in the order given.
+
+        Returns the entries once committed; raises if the write failed.
+        """
+        return self.submit(items).result()
+
+    def submit(self, items):
+        """Queue (content, when) notes without waiting; returns a Future of their entries"""
+        entries = []
+        for content, when in items:
+            when = when.astimezone(self.tz) if when else self.now()
+            entries.append({
+                'day': self.day_key(when),
+                'time': when.strftime('%H:%M'),
+                'ts': when.isoformat(timespec='seconds'),
+                'content': content,
+            })
+
+        done = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Note store is closed")
+            self._pending.append((entries, done))
+            self._cond.notify()
+        return done
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait(timeout=self.fsync_interval if self._unsynced else None)
+                    if self._unsynced and not self._pending:
+                        break
+                batch, self._pending = self._pending, []
+                closing = self._closed
+
+            if batch:
+                failed = self._commit([entry for entries, _ in batch for entry in entries])
+                for entries, done in batch:
+                    error = next((failed[e['day']] for e in entries if e['day'] in failed), None)
+                    if error:
+                        done.set_exception(error)
+                    else:
+                        done.set_result(entries)
+
+            if self._unsynced and (closing or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._sync_pending()
+
+            if closing and not batch:
+                return
+
+    def _commit(self, entries):
+        """Write entries grouped by day; returns {day: exception} for days that failed"""
+        by_day = {}
+        for entry in entries:
+            by_day.setdefault(entry['day'], []).append(entry)
+
+        failed = {}
+        for day, day_entries in by_day.items():
+            try:
+                self._commit_day(day, day_entries)
+            except Exception as e:
+                print(f"Note store write failed for {day}: {e}")
+                failed[day] = e
+        return failed
+
+    def _commit_day(self, day, day_entries):
+        self._migrate_legacy(day)
+        log_path = self.log_path(day)
+
+        with open(log_path, 'ab') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                lines = [
+                    (json.dumps({'ts': entry['ts'], 'time': entry['time'], 'content': entry['content']}) + '\n').encode()
+                    for entry in day_entries
+                ]
+                # Readers index whatever the file holds, so the write and our
+                # own offsets go in under one lock; otherwise a reader could
+                # index these lines first and we'd record them twice
+                with self._index_lock:
+                    # Pick up anything other processes appended before numbering ours
+                    index = self._catch_up(day)
+                    offset = index.size
+                    f.write(b''.join(lines))
+                    f.flush()
+
+                    # Ids only once the lines are written
+                    for i, entry in enumerate(day_entries):
+                        entry['id'] = len(index.offsets) + i
+                    for line in lines:
+                        index.offsets.append(offset)
+                        offset += len(line)
+                    index.size = offset
+
+                # fsync outside the lock so readers aren't held up by the disk
+                self._sync_file(f, log_path)
+
+                # Keep the markdown view in step with the log. The log is the
+                # source of truth, so the notes count as saved either way.
+                try:
+                    self._append_markdown(day, day_entries)
+                except OSError as e:
+                    print(f"Markdown view update failed for {day}: {e}")
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _append_markdown(self, day, entries):
+        md_path = self.markdown_path(day)
+        rendered = '\n'.join(f"- **{e['time']}**: {e['content']}" for e in entries)
+        with open(md_path, 'a') as f:
+            if f.tell() == 0:
+                f.write(self.markdown_header(day) + rendered)
+            else:
+                f.write('\n' + rendered)
+            f.flush()
+            self._sync_file(f, md_path)
+
+    def _sync_file(self, f, path):
+        if self.fsync == 'always':
+            os.fsync(f.fileno())
+        elif self.fsync == 'interval':
+            self._unsynced.add(path)
+
+    def _sync_pending(self):
+        for path in self._unsynced:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+        self._unsynced.clear()
+        self._last_fsync = time.monotonic()
+
+    def _migrate_legacy(self, day):
+        """Seed a day's log from its markdown file if it predates the log"""
+        log_path = self.log_path(day)
+        md_path = self.markdown_path(day)
+        if os.path.exists(log_path) or not os.path.exists(md_path):
+            return
+
+        with open(md_path, 'r') as f:
+            legacy = parse_markdown(f.read())
+
+        tmp_path = f"{log_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in legacy:
+                f.write(json.dumps({'ts': None, 'time': entry['time'], 'content': entry['content']}) + '\n')
+        try:
+            # link() fails if another process migrated first
+            os.link(tmp_path, log_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    # Reading
+
+    def _index(self, day):
+        """Return the day's offset index, extended with any newly appended lines"""
+        with self._index_lock:
+            return self._catch_up(day)
+
+    def _catch_up(self, day):
+        """Index lines appended by other processes (caller holds _index_lock)"""
+        index = self._indexes.setdefault(day, DayIndex())
+        try:
+            size = os.path.getsize(self.log_path(day))
+        except FileNotFoundError:
+            return index
+
+        if size < index.size:
+            # Log was replaced underneath us - rebuild
+            index = self._indexes[day] = DayIndex()
+        if size > index.size:
+            with open(self.log_path(day), 'rb') as f:
+                f.seek(index.size)
+                offset = index.size
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Another writer is mid-append
+                        break
+                    index.offsets.append(offset)
+                    offset += len(line)
+            index.size = offset
+        return index
+
+    def version(self, day=None):
+        """Cheap change marker for a day's notes: (log size, log mtime)"""
+        day = day or self.day_key()
+        try:
+            stat = os.stat(self.log_path(day))
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def count(self, day=None):
+        day = day or self.day_key()
+        self._migrate_legacy(day)
+        return len(self._index(day).offsets)
+
+    def entries(self, day=None, start=0, limit=None):
+        """Read entries [start, start+limit) of a day, touching only those bytes"""
+        day = day or self.day_key()
+        self._migrate_legacy(day)
+        index = self._index(day)
+
+        with self._index_lock:
+            offsets = index.offsets
+            total = len(offsets)
+            start = max(start, 0)
+            end = total if limit is None else min(start + limit, total)
+            if start >= end:
+                return []
+            begin = offsets[start]
+            stop = offsets[end] if end < total else index.size
+
+        with open(self.log_path(day), 'rb') as f:
+            f.seek(begin)
+            data = f.read(stop - begin)
+
+        result = []
+        for i, line in enumerate(data.splitlines(), start):
+            record = json.loads(line)
+            record['id'] = i
+            record['day'] = day
+            result.append(record)
+        return result
+
+    def days(self):
+        """Every day that has notes (a log or a legacy markdown file), oldest first.
+
+        The listing is cached until either directory's mtime changes, which
+        happens whenever a day file is created or removed.
+        """
+        key = []
+        for directory in (self.log_dir, self.notes_dir):
+            try:
+                key.append(os.stat(directory).st_mtime_ns)
+            except FileNotFoundError:
+                key.append(None)
+        key = tuple(key)
+        if self._days_cache and self._days_cache[0] == key:
+            return self._days_cache[1]
+
+        days = set()
+        for directory in (self.log_dir, self.notes_dir):
+            try:
+                names = os.listdir(directory)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                match = DAY_FILE.match(name)
+                if match:
+                    days.add(match.group(1))
+        days = sorted(days)
+        self._days_cache = (key, days)
+        return days
+
+    def render_markdown(self, day=None):
+        """Render a day's notes as markdown (empty string when there are none)"""
+        day = day or self.day_key()
+        entries = self.entries(day)
+        if not entries:
+            return ""
+        return self.markdown_header(day) + '\n'.join(
+            f"- **{e['time']}**: {e['content']}" for e in entries
+        )
+
+    def close(self):
+        """Commit anything queued and stop the writer thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        # Let a closed store (e.g. an evicted session's) be freed
+        atexit.unregister(self.close)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Cross-process locking for appends (not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Ollama embedding model, notes embedded per request, and recall defaults
+EMBED_MODEL = os.getenv('EMBED_MODEL', 'nomic-embed-text')
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '32'))
+RECALL_TOP_K = int(os.getenv('RECALL_TOP_K', '5'))
+# Cosine similarity a note needs before it's offered to the chat model
+RECALL_MIN_SCORE = float(os.getenv('RECALL_MIN_SCORE', '0.5'))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class RecallIndex:
+    """Semantic search over a NoteStore using Ollama embeddings.
+
+    Vectors are unit-normalized float32 rows appended to vectors.f32 and
+    read through a memory map, so cosine similarity against every note is
+    one matrix-vector product. keys.jsonl holds [day, id, hash] for each
+    row. Notes are embedded in batches by a background thread; a note
+    whose text was seen before reuses the stored vector instead of
+    calling the model again.
+    """
+
+    def __init__(self, store, index_dir, client, model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE):
+        self.store = store
+        self.index_dir = index_dir
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+
+        self.meta_path = os.path.join(index_dir, 'meta.json')
+        self.keys_path = os.path.join(index_dir, 'keys.jsonl')
+        self.vectors_path = os.path.join(index_dir, 'vectors.f32')
+
+        self.lock = threading.Lock()
+        self.keys = []
+        self.keys_size = 0
+        self.known = set()
+        self.by_hash = {}
+        self.dim = None
+        self.matrix = None
+        self.query_cache = OrderedDict()
+        self.backfilled = False
+
+        self.pending = queue.Queue()
+        self.queued = set()
+        self._load()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    # Storage
+
+    def _load(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            meta = {}
+        if meta.get('model') not in (None, self.model):
+            # Vectors from another model aren't comparable - start over
+            shutil.rmtree(self.index_dir)
+            os.makedirs(self.index_dir)
+            meta = {}
+        self.dim = meta.get('dim')
+        self._refresh()
+
+    def _refresh(self):
+        """Pick up rows appended since the last look (by us or another process)"""
+        try:
+            size = os.path.getsize(self.keys_path)
+        except FileNotFoundError:
+            return
+        if size > self.keys_size:
+            with open(self.keys_path, 'rb') as f:
+                f.seek(self.keys_size)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    day, note_id, digest = json.loads(line)
+                    self.by_hash.setdefault(digest, len(self.keys))
+                    self.keys.append((day, note_id))
+                    self.known.add((day, note_id))
+                    self.keys_size += len(line)
+
+        if self.dim is None:
+            try:
+                with open(self.meta_path, 'r') as f:
+                    self.dim = json.load(f)['dim']
+            except (FileNotFoundError, ValueError, KeyError):
+                return
+        if self.keys and (self.matrix is None or len(self.matrix) != len(self.keys)):
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                    shape=(len(self.keys), self.dim))
+
+    def _append(self, rows):
+        """Append [(day, id, hash, vector)] to the index files"""
+        with open(self.keys_path, 'ab') as keys_file:
+            if fcntl:
+                fcntl.flock(keys_file, fcntl.LOCK_EX)
+            try:
+                with self.lock:
+                    self._refresh()
+                    rows = [row for row in rows if (row[0], row[1]) not in self.known]
+                    count, keys_size = len(self.keys), self.keys_size
+                if not rows:
+                    return
+
+                if self.dim is None:
+                    self.dim = len(rows[0][3])
+                    with open(self.meta_path, 'w') as f:
+                        json.dump({'model': self.model, 'dim': self.dim}, f)
+
+                # Vectors first, so a crash never leaves a key without its row.
+                # Write after the last keyed row, dropping anything a crashed
+                # append left behind in either file
+                vectors = np.asarray([row[3] for row in rows], dtype=np.float32)
+                fd = os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+                with open(fd, 'r+b') as f:
+                    f.truncate(count * self.dim * 4)
+                    f.seek(count * self.dim * 4)
+                    f.write(vectors.tobytes())
+                keys_file.truncate(keys_size)
+                keys_file.write(b''.join(json.dumps([day, note_id, digest]).encode() + b'\n'
+                                         for day, note_id, digest, _ in rows))
+                keys_file.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(keys_file, fcntl.LOCK_UN)
+
+        with self.lock:
+            self._refresh()
+
+    # Embedding
+
+    def _embed(self, texts):
+        """Unit-length embeddings for a list of texts, in one Ollama call"""
+        response = self.client.embed(model=self.model, input=texts)
+        vectors = np.asarray(response['embeddings'], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, entries):
+        """Queue freshly saved store entries for embedding (returns immediately)"""
+        for entry in entries:
+            key = (entry['day'], entry['id'])
+            with self.lock:
+                if key in self.queued:
+                    continue
+                self.queued.add(key)
+            self.pending.put(entry)
+
+    def _worker(self):
+        while True:
+            batch = [self.pending.get()]
+            if batch[0] is None:
+                break
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self.pending.get(timeout=0.05)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self.pending.put(None)
+                    break
+                batch.append(entry)
+            try:
+                self._embed_batch(batch)
+            except Exception as e:
+                print(f"Embedding failed for {len(batch)} notes: {e}")
+            finally:
+                with self.lock:
+                    self.queued.difference_update((entry['day'], entry['id']) for entry in batch)
+
+    def _embed_batch(self, entries):
+        rows = []
+        to_embed = []
+        with self.lock:
+            for entry in entries:
+                key = (entry['day'], entry['id'])
+                if key in self.known:
+                    continue
+                digest = content_hash(entry['content'])
+                cached = self.by_hash.get(digest)
+                if cached is not None and self.matrix is not None and cached < len(self.matrix):
+                    rows.append((*key, digest, np.array(self.matrix[cached])))
+                else:
+                    to_embed.append((key, digest, entry['content']))
+
+        if to_embed:
+            # Repeated text within the batch is embedded once
+            unique = {digest: text for _, digest, text in to_embed}
+            vectors = dict(zip(unique, self._embed(list(unique.values()))))
+            rows.extend((*key, digest, vectors[digest]) for key, digest, _ in to_embed)
+        if rows:
+            self._append(rows)
+
+    def sync(self):
+        """Queue every stored note that isn't embedded yet (all days once, then today)"""
+        days = [self.store.day_key()] if self.backfilled else self.store.days()
+        with self.lock:
+            self._refresh()
+            known = set(self.known)
+        per_day = Counter(day for day, _ in known)
+        for day in days:
+            if per_day[day] < self.store.count(day):
+                self.add(entry for entry in self.store.entries(day) if (day, entry['id']) not in known)
+        self.backfilled = True
+
+    # Search
+
+    def _query_vector(self, text):
+        with self.lock:
+            vector = self.query_cache.get(text)
+        if vector is None:
+            vector = self._embed([text])[0]
+            with self.lock:
+                self.query_cache[text] = vector
+                if len(self.query_cache) > 256:
+                    self.query_cache.popitem(last=False)
+        return vector
+
+    def recall(self, query, k=RECALL_TOP_K, min_score=0.0):
+        """Notes most similar to the query, best first, as store entries with a score"""
+        self.sync()
+        with self.lock:
+            self._refresh()
+            matrix, keys = self.matrix, list(self.keys)
+        if matrix is None or not query.strip():
+            return []
+
+        scores = matrix @ self._query_vector(query)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for row in top:
+            score = float(scores[row])
+            if score < min_score:
+                break
+            day, note_id = keys[row]
+            entry = self.store.entries(day, start=note_id, limit=1)
+            if entry:
+                results.append({**entry[0], "score": round(score, 4)})
+        return results
+
+    def context(self, query, k=3, min_score=RECALL_MIN_SCORE):
+        """Relevant notes formatted for a chat prompt, or None if nothing is close enough"""
+        notes = self.recall(query, k=k, min_score=min_score)
+        if not notes:
+            return None
+        lines = '\n'.join(f"- {note['day']} {note['time']}: {note['content']}" for note in notes)
+        return f"Possibly relevant notes from my daily notes:\n{lines}"
+
+    def close(self):
+        """Stop the embedding thread once the notes already queued are done"""
+        self.pending.put(None)
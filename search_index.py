@@ -0,0 +1,133 @@
+import os
+import re
+import sqlite3
+import threading
+
+# Default and largest page size for /api/search
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = 100
+
+# A note's rowid is YYYYMMDD * NOTE_ID_SPAN + its id within the day, so a
+# date range is a rowid range and notes are never indexed twice
+NOTE_ID_SPAN = 1_000_000
+
+
+def note_rowid(day, note_id=0):
+    return int(day.replace('-', '')) * NOTE_ID_SPAN + note_id
+
+
+def match_query(text):
+    """FTS5 query for free text: every word must match, the last one as a prefix"""
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchIndex:
+    """SQLite FTS5 full-text index over a NoteStore.
+
+    New notes are added as they're saved. Anything written behind our
+    back (older markdown files, the desktop app, another worker) is
+    picked up by sync(): every day is compared against the index on the
+    first search, and today's log before each search after that.
+    """
+
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5('
+            'content, day UNINDEXED, time UNINDEXED, tokenize="unicode61 remove_diacritics 2")'
+        )
+        self.lock = threading.Lock()
+        self.backfilled = False
+
+    def _insert(self, entry):
+        try:
+            self.db.execute(
+                'INSERT INTO notes(rowid, content, day, time) VALUES (?, ?, ?, ?)',
+                (note_rowid(entry['day'], entry['id']), entry['content'], entry['day'], entry['time']),
+            )
+        except sqlite3.IntegrityError:
+            # Already indexed, e.g. by another worker process
+            pass
+
+    def add(self, entries):
+        """Index freshly saved store entries"""
+        with self.lock, self.db:
+            for entry in entries:
+                self._insert(entry)
+
+    def _sync_day(self, day):
+        start, end = note_rowid(day), note_rowid(day) + NOTE_ID_SPAN
+        indexed = {row[0] - start for row in self.db.execute(
+            'SELECT rowid FROM notes WHERE rowid >= ? AND rowid < ?', (start, end))}
+        if len(indexed) >= self.store.count(day):
+            return 0
+
+        missing = [entry for entry in self.store.entries(day) if entry['id'] not in indexed]
+        for entry in missing:
+            self._insert(entry)
+        return len(missing)
+
+    def sync(self):
+        """Index notes that were written without going through add()"""
+        with self.lock, self.db:
+            if self.backfilled:
+                return self._sync_day(self.store.day_key())
+
+            counts = dict(self.db.execute(
+                'SELECT rowid / ?, count(*) FROM notes GROUP BY rowid / ?', (NOTE_ID_SPAN, NOTE_ID_SPAN)))
+            added = 0
+            for day in self.store.days():
+                if counts.get(note_rowid(day) // NOTE_ID_SPAN, 0) < self.store.count(day):
+                    added += self._sync_day(day)
+            self.backfilled = True
+            return added
+
+    def search(self, query, day_from=None, day_to=None, page=1, limit=SEARCH_PAGE_SIZE):
+        """Best matches first (BM25, then newest), one page at a time"""
+        self.sync()
+        result = {"query": query, "total": 0, "page": page, "limit": limit, "results": []}
+        match = match_query(query)
+        if match is None:
+            return result
+
+        where = ['notes MATCH ?']
+        params = [match]
+        if day_from:
+            where.append('rowid >= ?')
+            params.append(note_rowid(day_from))
+        if day_to:
+            where.append('rowid < ?')
+            params.append(note_rowid(day_to) + NOTE_ID_SPAN)
+        where = ' AND '.join(where)
+
+        with self.lock:
+            result["total"] = self.db.execute(f'SELECT count(*) FROM notes WHERE {where}', params).fetchone()[0]
+            rows = self.db.execute(
+                f"SELECT rowid, day, time, content, snippet(notes, 0, '<mark>', '</mark>', '…', 16), bm25(notes) "
+                f"FROM notes WHERE {where} ORDER BY bm25(notes), rowid DESC LIMIT ? OFFSET ?",
+                params + [limit, (page - 1) * limit],
+            ).fetchall()
+
+        result["results"] = [{
+            "day": day,
+            "id": rowid % NOTE_ID_SPAN,
+            "time": time,
+            "content": content,
+            "snippet": snippet,
+            "score": round(-rank, 6),
+        } for rowid, day, time, content, snippet, rank in rows]
+        return result
+
+    def close(self):
+        with self.lock:
+            self.db.close()
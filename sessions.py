@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Requests pick their user with this header (or ?user= where headers can't
+# be set, e.g. EventSource and WebSocket). Without one they share the
+# default user, whose notes stay directly in notes/.
+LISTENY_USER_HEADER = os.getenv('LISTENY_USER_HEADER', 'X-Listeny-User')
+DEFAULT_USER = 'default'
+
+# Users kept open in memory, and recent notes kept per user
+LISTENY_MAX_SESSIONS = int(os.getenv('LISTENY_MAX_SESSIONS', '256'))
+NOTES_HISTORY_SIZE = int(os.getenv('NOTES_HISTORY_SIZE', '100'))
+
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class InvalidUser(ValueError):
+    """Raised for user ids that aren't safe to use as a directory name"""
+
+
+def resolve_user(headers, query_params):
+    """User id for a request, from the user header or the ?user= parameter"""
+    user_id = headers.get(LISTENY_USER_HEADER) or query_params.get('user') or DEFAULT_USER
+    if not USER_ID_PATTERN.match(user_id):
+        raise InvalidUser(f"Invalid user id '{user_id[:64]}'")
+    return user_id
+
+
+def user_notes_dir(notes_root, user_id):
+    """Each user's notes get their own shard directory"""
+    if user_id == DEFAULT_USER:
+        return notes_root
+    return os.path.join(notes_root, 'users', user_id)
+
+
+class SessionState:
+    """Small per-user settings file, shared by every worker process.
+
+    Reads go through an in-memory copy that is reloaded when the file's
+    mtime changes, so a mode switch handled by one uvicorn worker is seen
+    by the others on their next request.
+    """
+
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = dict(defaults)
+        self.values = dict(defaults)
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.values = {**self.defaults, **json.load(f)}
+            self.mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key):
+        with self.lock:
+            self._reload()
+            return self.values[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self._reload()
+            self.values[key] = value
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.values, f)
+            os.replace(tmp_path, self.path)
+            self.mtime = os.stat(self.path).st_mtime_ns
+
+
+class SessionRegistry:
+    """LRU of open per-user sessions, created on first use.
+
+    factory(user_id) builds a session. Callers lease a session with
+    acquire() and hand it back with release(); once there are more than
+    max_sessions, the least recently used sessions nobody holds are
+    closed with their close() method. A session with an open request or
+    stream is never closed under it, so the registry can run over the
+    limit while every session is busy. Everything a session keeps on
+    disk lives in its own shard, so an evicted user simply reopens later.
+    """
+
+    def __init__(self, factory, max_sessions=LISTENY_MAX_SESSIONS):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        # Leases held per user
+        self.active = Counter()
+        self.lock = threading.Lock()
+
+    def acquire(self, user_id):
+        """The user's session, held open until the matching release()"""
+        with self.lock:
+            session = self.sessions.get(user_id)
+            if session is None:
+                session = self.sessions[user_id] = self.factory(user_id)
+            else:
+                self.sessions.move_to_end(user_id)
+            self.active[user_id] += 1
+            evicted = self._evict()
+
+        for old in evicted:
+            old.close()
+        return session
+
+    def release(self, user_id):
+        with self.lock:
+            self.active[user_id] -= 1
+            if self.active[user_id] <= 0:
+                del self.active[user_id]
+            evicted = self._evict()
+
+        for old in evicted:
+            old.close()
+
+    async def hold(self, user_id, stream):
+        """Pass an async generator through, keeping the user's session open while it runs"""
+        self.acquire(user_id)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+            self.release(user_id)
+
+    def _evict(self):
+        """Drop least recently used idle sessions while over the limit (lock held)"""
+        excess = len(self.sessions) - self.max_sessions
+        if excess <= 0:
+            return []
+        idle = [user_id for user_id in self.sessions if not self.active[user_id]][:excess]
+        return [self.sessions.pop(user_id) for user_id in idle]
+
+    def all(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    def close_all(self):
+        with self.lock:
+            sessions, self.sessions = list(self.sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
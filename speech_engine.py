@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+
+import speech_recognition as sr
+
+# Engine selection: "google" (online) or "vosk" (offline, needs a local model)
+STT_ENGINE = os.getenv('STT_ENGINE', 'google')
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'models', 'vosk'))
+
+# Sample rate local models expect
+MODEL_SAMPLE_RATE = 16000
+
+
+class BufferedStream:
+    """Collect streamed PCM and recognize it in one go when the stream ends"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.buffer = bytearray()
+
+    def accept(self, pcm):
+        """Feed 16 kHz mono 16-bit PCM; returns the partial transcript so far (if any)"""
+        self.buffer.extend(pcm)
+        return None
+
+    def finish(self):
+        if not self.buffer:
+            raise sr.UnknownValueError()
+        return self.engine.transcribe(sr.AudioData(bytes(self.buffer), MODEL_SAMPLE_RATE, 2))
+
+
+class SpeechEngine:
+    """Base class for speech-to-text backends.
+
+    transcribe() takes an sr.AudioData and returns the text, raising
+    sr.UnknownValueError when nothing intelligible was heard (the same
+    contract as Recognizer.recognize_google). create_stream() returns an
+    object with accept(pcm) -> partial text and finish() -> final text for
+    incremental recognition.
+    """
+
+    name = 'base'
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def create_stream(self):
+        return BufferedStream(self)
+
+
+class GoogleEngine(SpeechEngine):
+    """Google Web Speech API through SpeechRecognition (needs network access)"""
+
+    name = 'google'
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskEngine(SpeechEngine):
+    """Offline Kaldi recognition with a Vosk model loaded once and shared"""
+
+    name = 'vosk'
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        from vosk import Model, KaldiRecognizer, SetLogLevel
+
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path} (set VOSK_MODEL_PATH)")
+
+        SetLogLevel(-1)
+        self._recognizer_class = KaldiRecognizer
+        self.model = Model(model_path)
+
+    def transcribe(self, audio):
+        pcm = audio.get_raw_data(convert_rate=MODEL_SAMPLE_RATE, convert_width=2)
+
+        # Recognizers are cheap; the model behind them is the shared part
+        recognizer = self._recognizer_class(self.model, MODEL_SAMPLE_RATE)
+        recognizer.AcceptWaveform(pcm)
+        text = json.loads(recognizer.FinalResult()).get('text', '').strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def create_stream(self):
+        return VoskStream(self._recognizer_class(self.model, MODEL_SAMPLE_RATE))
+
+
+class VoskStream:
+    """Incremental Vosk recognition that reports partial results as audio arrives"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+
+    def accept(self, pcm):
+        if self.recognizer.AcceptWaveform(pcm):
+            # Vosk detected the end of a phrase
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            if text:
+                self.segments.append(text)
+            return ' '.join(self.segments)
+
+        partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        return ' '.join(self.segments + [partial]).strip()
+
+    def finish(self):
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        if text:
+            self.segments.append(text)
+        full_text = ' '.join(self.segments).strip()
+        if not full_text:
+            raise sr.UnknownValueError()
+        return full_text
+
+
+ENGINES = {
+    'google': GoogleEngine,
+    'vosk': VoskEngine,
+}
+
+
+def create_engine(name=STT_ENGINE):
+    """Build a speech engine by name"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown speech engine '{name}' (choose from {', '.join(ENGINES)})")
+    return ENGINES[name]()
+
+
+# Process-wide engine, loaded once and shared by every caller
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the shared speech engine, loading the model on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine()
+    return _engine
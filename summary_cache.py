@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', '256'))
+SUMMARY_CACHE_TTL = float(os.getenv('SUMMARY_CACHE_TTL', str(7 * 24 * 3600)))
+
+
+class SummaryCache:
+    """Content-addressed LRU cache of LLM summaries, persisted as JSON.
+
+    Entries are keyed by a hash of the model and the exact text that was
+    summarized, so any change to the notes is a miss. Each entry also
+    records which day it covers and how many notes were in it, so a later
+    call can summarize only the notes added since and merge them in.
+    """
+
+    def __init__(self, path, max_entries=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._load()
+
+    @staticmethod
+    def key(model, content):
+        return hashlib.sha256(f"{model}\0{content}".encode()).hexdigest()
+
+    def _expired(self, entry):
+        return self.ttl and time.time() - entry['created'] > self.ttl
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def latest(self, model, day):
+        """Most recent live summary for a day, used as the base for incremental updates"""
+        best = None
+        for entry in self.entries.values():
+            if entry.get('model') == model and entry.get('day') == day and not self._expired(entry):
+                if best is None or entry['count'] > best['count']:
+                    best = entry
+        return best
+
+    def put(self, key, summary, model, day=None, count=0):
+        self.entries[key] = {
+            'summary': summary,
+            'model': model,
+            'day': day,
+            'count': count,
+            'created': time.time(),
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = OrderedDict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            self.entries = OrderedDict()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
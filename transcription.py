@@ -0,0 +1,236 @@
+import asyncio
+import io
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+import speech_recognition as sr
+
+from speech_engine import get_engine
+
+# PyAV decodes in-process; without it we pipe through an ffmpeg subprocess
+try:
+    import av
+except ImportError:
+    av = None
+
+# Worker pool configuration (thread or process pool)
+TRANSCRIBE_EXECUTOR = os.getenv('TRANSCRIBE_EXECUTOR', 'thread')
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', os.cpu_count() or 2))
+TRANSCRIBE_QUEUE_SIZE = int(os.getenv('TRANSCRIBE_QUEUE_SIZE', '16'))
+
+# Decoded audio format handed to the recognizer (16 kHz mono 16-bit PCM)
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class TranscriptionBusy(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class StageTimer:
+    """Record wall-clock time (in ms) spent in each stage of a request"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _decode_with_av(content):
+    """Decode in-process with PyAV, resampling to mono s16 PCM"""
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=SAMPLE_RATE)
+    pcm = bytearray()
+
+    def collect(frames):
+        for frame in frames:
+            # planes can carry alignment padding past the last sample
+            pcm.extend(bytes(frame.planes[0])[:frame.samples * SAMPLE_WIDTH])
+
+    with av.open(io.BytesIO(content)) as container:
+        for frame in container.decode(audio=0):
+            collect(resampler.resample(frame))
+    collect(resampler.resample(None))
+    return bytes(pcm)
+
+
+def _decode_with_ffmpeg(content):
+    """Decode by piping the bytes through ffmpeg's stdin/stdout"""
+    proc = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+         '-i', 'pipe:0',
+         '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+         'pipe:1'],
+        input=content,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout
+
+
+def decode_to_pcm(content):
+    """Decode an uploaded clip (WebM/Ogg/WAV...) to raw PCM without temp files"""
+    if av is not None:
+        return _decode_with_av(content)
+    return _decode_with_ffmpeg(content)
+
+
+def decode_audio(content):
+    """Decode an uploaded clip straight into recognizer-ready AudioData"""
+    return sr.AudioData(decode_to_pcm(content), SAMPLE_RATE, SAMPLE_WIDTH)
+
+
+class StreamingDecoder:
+    """ffmpeg process that decodes a chunked container stream (e.g. MediaRecorder
+    WebM slices) to PCM as the chunks arrive. One process serves a whole stream.
+
+    The pipes are driven by the event loop (asyncio subprocess streams), so an
+    open stream doesn't tie up an executor thread while it waits for audio.
+    """
+
+    def __init__(self, proc):
+        self.proc = proc
+
+    @classmethod
+    async def start(cls):
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+            'pipe:1',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return cls(proc)
+
+    async def write(self, chunk):
+        self.proc.stdin.write(chunk)
+        await self.proc.stdin.drain()
+
+    async def read(self, size=8192):
+        """Wait for decoded PCM; returns b'' once the stream ends"""
+        return await self.proc.stdout.read(size)
+
+    def close_input(self):
+        if not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    async def close(self):
+        self.close_input()
+        if self.proc.returncode is None:
+            self.proc.kill()
+        await self.proc.wait()
+
+
+def transcribe_audio(content, submitted_at=None):
+    """Decode an uploaded clip in memory and convert the speech to text.
+
+    Runs inside the worker pool, so it has to stay a module-level function
+    (the process pool pickles it by reference).
+    """
+    timer = StageTimer()
+    if submitted_at is not None:
+        timer.timings['queue'] = round(max(time.time() - submitted_at, 0) * 1000, 2)
+
+    with timer.stage('decode'):
+        audio = decode_audio(content)
+
+    # Convert speech to text
+    with timer.stage('recognize'):
+        text = get_engine().transcribe(audio)
+
+    return {"text": text, "timings": timer.timings}
+
+
+class TranscriptionExecutor:
+    """Bounded worker pool that keeps blocking audio work off the event loop"""
+
+    def __init__(self, kind=TRANSCRIBE_EXECUTOR, max_workers=TRANSCRIBE_WORKERS,
+                 max_queue=TRANSCRIBE_QUEUE_SIZE):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        if kind == 'process':
+            # Each worker process loads its own copy of the model up front
+            self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=get_engine)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        # Streaming recognizers live in this process, so their steps always
+        # run on threads, even when clips go to worker processes
+        self.stream_pool = self.pool if kind != 'process' else ThreadPoolExecutor(max_workers=max_workers)
+
+        # Jobs submitted but not finished (running + waiting). Only touched
+        # from the event loop thread, so no lock is needed.
+        self.pending = 0
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    @property
+    def queued(self):
+        return max(self.pending - self.max_workers, 0)
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool, rejecting work once the queue is full"""
+        if self.pending >= self.capacity:
+            raise TranscriptionBusy(
+                f"Transcription queue full ({self.pending}/{self.capacity})"
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, func, *args)
+        finally:
+            self.pending -= 1
+
+    @contextmanager
+    def stream_slot(self):
+        """Count a streaming transcription as one job for as long as it's open.
+
+        Yields a coroutine function that runs the stream's blocking steps
+        (accept, finish) on the pool's threads without taking another slot.
+        """
+        if self.pending >= self.capacity:
+            raise TranscriptionBusy(
+                f"Transcription queue full ({self.pending}/{self.capacity})"
+            )
+
+        self.pending += 1
+        try:
+            yield self.run_stream_step
+        finally:
+            self.pending -= 1
+
+    async def run_stream_step(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.stream_pool, func, *args)
+
+    async def warm_up(self):
+        """Load the speech engine before the first request needs it"""
+        if self.kind != 'process':
+            await asyncio.get_running_loop().run_in_executor(self.pool, get_engine)
+
+    def stats(self):
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "queued": self.queued,
+            "capacity": self.capacity,
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.stream_pool is not self.pool:
+            self.stream_pool.shutdown(wait=False, cancel_futures=True)
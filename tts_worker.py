@@ -0,0 +1,154 @@
+import hashlib
+import itertools
+import os
+import queue
+import re
+import threading
+import wave
+
+import pyaudio
+import pyttsx3
+
+# Synthesized audio for phrases spoken with cache=True
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'tts'))
+
+# Lower numbers are spoken first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+# End of a sentence: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(buffer):
+    """Split streamed text into complete sentences and the unfinished remainder"""
+    parts = SENTENCE_END.split(buffer)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
+
+
+class TTSWorker:
+    """Single thread that owns the pyttsx3 engine and speaks queued utterances.
+
+    Text is split into sentences and queued by priority, so a short
+    confirmation can go ahead of the rest of a long answer. cancel() drops
+    everything queued so far and stops the current sentence, which is
+    what barge-in uses when the user starts talking. Phrases queued with
+    cache=True are synthesized to a WAV once and played back from disk
+    afterwards.
+    """
+
+    def __init__(self, on_busy=None, on_idle=None, cache_dir=TTS_CACHE_DIR):
+        self.on_busy = on_busy
+        self.on_idle = on_idle
+        self.cache_dir = cache_dir
+
+        self.queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self.generation = 0
+        self.speaking = threading.Event()
+        self._interrupt = threading.Event()
+        self._uncacheable = set()
+        self.engine = None
+        self.audio = None
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def say(self, text, priority=PRIORITY_NORMAL, cache=False, generation=None):
+        """Queue text to be spoken; items from before the last cancel() are skipped"""
+        if generation is None:
+            generation = self.generation
+        if cache:
+            chunks = [text.strip()]
+        else:
+            chunks, rest = split_sentences(text)
+            if rest.strip():
+                chunks.append(rest.strip())
+        for chunk in chunks:
+            if chunk:
+                self.queue.put((priority, next(self._seq), generation, chunk, cache))
+
+    def cancel(self):
+        """Drop queued speech and cut off the sentence being spoken"""
+        self.generation += 1
+        if self.speaking.is_set():
+            self._interrupt.set()
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
+
+    def shutdown(self):
+        self.cancel()
+        self.queue.put((-1, next(self._seq), None, None, False))
+
+    def _run(self):
+        self.engine = pyttsx3.init()
+        while True:
+            _, _, generation, text, cache = self.queue.get()
+            if text is None:
+                break
+            if generation != self.generation:
+                # Dropped by cancel(); skipping the last of them ends the reply
+                self._idle_if_drained()
+                continue
+
+            self._interrupt.clear()
+            self.speaking.set()
+            if self.on_busy:
+                self.on_busy()
+            try:
+                if cache and text not in self._uncacheable:
+                    self._play_cached(text)
+                else:
+                    self.engine.say(text)
+                    self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+            finally:
+                self._idle_if_drained()
+
+    def _idle_if_drained(self):
+        if self.queue.empty() and self.speaking.is_set():
+            self.speaking.clear()
+            if self.on_idle:
+                self.on_idle()
+
+    def _cache_path(self, text):
+        return os.path.join(self.cache_dir, hashlib.sha1(text.encode()).hexdigest() + '.wav')
+
+    def _play_cached(self, text):
+        path = self._cache_path(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            self.engine.save_to_file(text, tmp_path)
+            self.engine.runAndWait()
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, path)
+
+        try:
+            clip = wave.open(path, 'rb')
+        except (wave.Error, EOFError, FileNotFoundError):
+            # Some drivers write AIFF or nothing at all; speak it live from now on
+            if os.path.exists(path):
+                os.remove(path)
+            self._uncacheable.add(text)
+            self.engine.say(text)
+            self.engine.runAndWait()
+            return
+
+        if self.audio is None:
+            self.audio = pyaudio.PyAudio()
+        with clip:
+            stream = self.audio.open(
+                format=self.audio.get_format_from_width(clip.getsampwidth()),
+                channels=clip.getnchannels(),
+                rate=clip.getframerate(),
+                output=True,
+            )
+            try:
+                data = clip.readframes(1024)
+                while data and not self._interrupt.is_set():
+                    stream.write(data)
+                    data = clip.readframes(1024)
+            finally:
+                stream.close()
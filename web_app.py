@@ -1,11 +1,27 @@
 import streamlit as st
 import speech_recognition as sr
+import queue
 import threading
 import time
 import os
-from datetime import datetime
-from zoneinfo import ZoneInfo
 from streamlit_keypress import key_press_events
+from speech_engine import get_engine
+from note_store import NoteStore
+from intents import classify
+from listener import ContinuousListener, LISTEN_HANGOVER, LISTEN_MAX_UTTERANCE
+
+# How often (seconds) the recorder panel polls the capture worker and the
+# notes panel checks today's log; each poll reruns one fragment, not the page
+WEB_POLL_SECONDS = float(os.getenv('WEB_POLL_SECONDS', '0.5'))
+WEB_NOTES_POLL_SECONDS = float(os.getenv('WEB_NOTES_POLL_SECONDS', '2'))
+# Give up when nobody starts talking this many seconds after pressing record
+# (speech already under way is never cut short by it)
+WEB_RECORD_TIMEOUT = float(os.getenv('WEB_RECORD_TIMEOUT', '10'))
+
+# How long "NOTED!", a status message and the key indicator stay up
+NOTED_SECONDS = 3.0
+STATUS_SECONDS = 5.0
+KEY_SECONDS = 1.0
 
 # Page configuration
 st.set_page_config(
@@ -15,8 +31,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better UI
-st.markdown("""
+# Custom CSS for better UI. Sent from the top level of the script, so only
+# full reruns emit it - fragment reruns leave it in place.
+STYLE = """
 <style>
     .main {
         background-color: #1a1a1a;
@@ -168,7 +185,128 @@ st.markdown("""
         100% { opacity: 0.5; }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(STYLE, unsafe_allow_html=True)
+
+@st.cache_resource
+def get_note_store(notes_dir):
+    """One note store (and writer thread) shared by every session and rerun"""
+    return NoteStore(notes_dir, heading="Aditya's Daily Notes")
+
+@st.cache_data(max_entries=32)
+def render_notes(notes_dir, day, version):
+    """A day's notes as markdown, re-read only when the log's size or mtime changes"""
+    return get_note_store(notes_dir).render_markdown(day)
+
+class CaptureWorker:
+    """Records and transcribes one utterance per press, off the script thread.
+
+    start() opens the mic through a ContinuousListener and returns at once;
+    a background thread waits for the first utterance, transcribes it,
+    saves the note and posts the outcome to `events` as (kind, value).
+    Only the script thread touches session state: it drains the queue on
+    the recorder fragment's next poll.
+    """
+
+    def __init__(self, note_store, speech_engine):
+        self.note_store = note_store
+        self.speech_engine = speech_engine
+        self.events = queue.Queue()
+        # idle, recording or processing
+        self.state = 'idle'
+        self.level = 0.0
+        # When the current utterance began (monotonic), None before any speech
+        self.speech_started = None
+        self.listener = ContinuousListener(on_level=self._on_level, on_speech_start=self._on_speech_start)
+        self._lock = threading.Lock()
+
+    def _on_level(self, level):
+        self.level = level
+
+    def _on_speech_start(self):
+        self.speech_started = time.monotonic()
+
+    @property
+    def busy(self):
+        return self.state != 'idle'
+
+    def start(self, note_mode):
+        with self._lock:
+            if self.busy:
+                return False
+            self.state = 'recording'
+        self.level = 0.0
+        self.speech_started = None
+        self.listener.start()
+        threading.Thread(target=self._run, args=(note_mode,), daemon=True).start()
+        return True
+
+    def stop(self):
+        """End the recording now; speech already captured is still transcribed"""
+        if self.state == 'recording':
+            self.listener.stop(flush=True)
+
+    def _run(self, note_mode):
+        try:
+            audio = self._record()
+            if audio is not None:
+                self.state = 'processing'
+                self._process(audio, note_mode)
+        except sr.UnknownValueError:
+            self.events.put(('status', "❌ Didn't understand - press 'R' to try again"))
+        except Exception as e:
+            self.events.put(('status', f"❌ Error: {str(e)}"))
+        finally:
+            self.state = 'idle'
+
+    def _record(self):
+        """The first utterance after start(), or None"""
+        wait = WEB_RECORD_TIMEOUT
+        while True:
+            try:
+                audio = self.listener.get(timeout=max(wait, 0))
+                break
+            except queue.Empty:
+                pass
+            # Only time out while nobody is talking: speech under way gets
+            # until the longest utterance the listener would cut it at
+            started = self.speech_started
+            wait = started + LISTEN_MAX_UTTERANCE + LISTEN_HANGOVER - time.monotonic() if started else 0
+            if wait <= 0:
+                # Stop, keeping a phrase that has only just begun
+                self.listener.stop(flush=True)
+                audio = self.listener.get()
+                if audio is None:
+                    self.events.put(('status', "⏰ Timeout - press 'R' to try again"))
+                    return None
+                break
+
+        if audio is None:
+            # The capture thread has exited: stopped before any speech
+            self.events.put(('status', "⏹️ Nothing recorded - press 'R' to try again"))
+            return None
+
+        # One utterance per press: release the mic and drop anything after it
+        self.listener.stop()
+        while self.listener.get() is not None:
+            pass
+        return audio
+
+    def _process(self, audio, note_mode):
+        text = self.speech_engine.transcribe(audio)
+        if not note_mode:
+            # Assistant mode - only note commands are saved
+            intent = classify(text)
+            if intent.kind != 'note':
+                self.events.put(('status', f"💬 Heard: '{text}' (not a note command)"))
+                return
+            text = intent.payload
+
+        note_content = text.strip()
+        if not note_content:
+            self.events.put(('status', "⚠️ Empty note - press 'R' to try again"))
+            return
+        self.events.put(('noted', self.note_store.append(note_content)))
 
 class ListenyKeyboard:
     def __init__(self):
@@ -176,259 +314,110 @@ class ListenyKeyboard:
         if 'notes_dir' not in st.session_state:
             st.session_state.notes_dir = os.path.join(os.path.dirname(__file__), 'notes')
             os.makedirs(st.session_state.notes_dir, exist_ok=True)
-        
-        if 'listening' not in st.session_state:
-            st.session_state.listening = False
-            
-        if 'status' not in st.session_state:
-            st.session_state.status = "Ready to record"
-            
-        if 'notes_history' not in st.session_state:
-            st.session_state.notes_history = []
-            
-        if 'note_mode' not in st.session_state:
-            st.session_state.note_mode = True
-            
-        if 'noted_message' not in st.session_state:
-            st.session_state.noted_message = False
-            
-        if 'last_key_press' not in st.session_state:
-            st.session_state.last_key_press = None
-        
+
+        defaults = {
+            'status': "Ready to record",
+            'status_until': 0.0,
+            'note_mode': True,
+            'noted_until': 0.0,
+            'last_key_press': None,
+            'key_until': 0.0,
+            'page_runs': 0,
+            'keys_seen_run': None,
+        }
+        for name, value in defaults.items():
+            if name not in st.session_state:
+                st.session_state[name] = value
+
         # Initialize components
-        self.recognizer = sr.Recognizer()
-    
-    def is_note_command(self, text):
-        """Check if command is a note-taking request"""
-        note_triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        text_lower = text.lower()
-        return any(trigger in text_lower for trigger in note_triggers)
-    
-    def extract_note(self, text):
-        """Extract the actual note content from the command"""
-        text_lower = text.lower()
-        triggers = ['note this', 'note that', 'take a note', 'remember this', 'remember that', 'add note', 'save note', 'write down', 'jot down']
-        note = text
-        for trigger in triggers:
-            if trigger in text_lower:
-                idx = text_lower.find(trigger) + len(trigger)
-                note = text[idx:].strip()
-                for filler in ['that', 'to', ':', '-']:
-                    if note.lower().startswith(filler):
-                        note = note[len(filler):].strip()
-                break
-        return note if note else text
-    
-    def save_note(self, note_content):
-        """Save note to today's markdown file"""
-        chicago_tz = ZoneInfo("America/Chicago")
-        today = datetime.now(chicago_tz)
-        filename = today.strftime('%Y-%m-%d') + '.md'
-        filepath = os.path.join(st.session_state.notes_dir, filename)
-        
-        timestamp = today.strftime('%H:%M')
-        
-        if os.path.exists(filepath):
-            with open(filepath, 'a') as f:
-                f.write(f"\n- **{timestamp}**: {note_content}")
-        else:
-            with open(filepath, 'w') as f:
-                f.write(f"# Notes for {today.strftime('%A, %B %d, %Y')}\n\n")
-                f.write(f"## Aditya's Daily Notes\n\n")
-                f.write(f"- **{timestamp}**: {note_content}")
-        
-        # Add to history for display
-        st.session_state.notes_history.append({
-            'time': timestamp,
-            'content': note_content
-        })
-        
-        return filepath
-    
+        self.note_store = get_note_store(st.session_state.notes_dir)
+        if 'capture' not in st.session_state:
+            st.session_state.capture = CaptureWorker(self.note_store, get_engine())
+        self.capture = st.session_state.capture
+
+    def set_status(self, text, hold=STATUS_SECONDS):
+        """Show a status message, reverting to the ready prompt after `hold` seconds"""
+        st.session_state.status = text
+        st.session_state.status_until = time.time() + hold if hold else 0.0
+
     def start_listening(self):
         """Start voice recognition"""
-        if not st.session_state.listening:
-            st.session_state.listening = True
-            st.session_state.status = "🎙️ Recording... Press 'S' to stop"
-            st.session_state.noted_message = False
-            
-            # Start listening in background thread
-            thread = threading.Thread(target=self.listen_and_process, daemon=True)
-            thread.start()
-            
-            # Show key press feedback
-            st.session_state.last_key_press = "r"
-            time.sleep(0.5)
-            st.session_state.last_key_press = None
-    
-    def listen_and_process(self):
-        """Listen for voice and process"""
-        try:
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=10)
-            
-            # Convert speech to text
-            text = self.recognizer.recognize_google(audio)
-            
-            if st.session_state.note_mode:
-                # Note mode - just save text directly
-                note_content = text.strip()
-                if note_content:
-                    filepath = self.save_note(note_content)
-                    st.session_state.status = "✅ NOTED! Press 'R' to record again"
-                    st.session_state.noted_message = True
-                else:
-                    st.session_state.status = "⚠️ Empty note - press 'R' to try again"
-            else:
-                # Assistant mode - check for note commands
-                if self.is_note_command(text):
-                    note_content = self.extract_note(text)
-                    filepath = self.save_note(note_content)
-                    st.session_state.status = "✅ NOTED! Press 'R' to record again"
-                    st.session_state.noted_message = True
-                else:
-                    st.session_state.status = f"💬 Heard: '{text}' (not a note command)"
-            
-        except sr.WaitTimeoutError:
-            st.session_state.status = "⏰ Timeout - press 'R' to try again"
-        except sr.UnknownValueError:
-            st.session_state.status = "❌ Didn't understand - press 'R' to try again"
-        except Exception as e:
-            st.session_state.status = f"❌ Error: {str(e)}"
-        
-        st.session_state.listening = False
-        
-        # Clear noted message after 3 seconds
-        threading.Timer(3.0, self.clear_noted_message).start()
-        
-        # Reset status after 5 seconds
-        threading.Timer(5.0, self.reset_status).start()
-    
-    def clear_noted_message(self):
-        """Clear noted message"""
-        st.session_state.noted_message = False
-        st.rerun()
-    
-    def reset_status(self):
-        """Reset to default status"""
-        if not st.session_state.listening:
-            st.session_state.status = "Ready to record - Press 'R'"
-            st.rerun()
-    
+        if self.capture.start(st.session_state.note_mode):
+            self.set_status("🎙️ Recording... Press 'S' to stop", hold=None)
+            st.session_state.noted_until = 0.0
+
     def stop_listening(self):
         """Stop voice recognition"""
-        if st.session_state.listening:
-            st.session_state.listening = False
-            st.session_state.status = "Processing..."
-            
-            # Show key press feedback
-            st.session_state.last_key_press = "s"
-            time.sleep(0.5)
-            st.session_state.last_key_press = None
-            st.rerun()
-    
-    def handle_keyboard(self):
-        """Handle keyboard input using streamlit-keypress"""
+        if self.capture.state == 'recording':
+            self.capture.stop()
+            self.set_status("Processing...", hold=None)
+
+    def drain_events(self):
+        """Apply whatever the capture worker reported since the last poll"""
+        while True:
+            try:
+                kind, value = self.capture.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'noted':
+                st.session_state.noted_until = time.time() + NOTED_SECONDS
+                self.set_status("✅ NOTED! Press 'R' to record again")
+            else:
+                self.set_status(value)
+
+        if st.session_state.status_until and time.time() >= st.session_state.status_until:
+            self.set_status("Ready to record - Press 'R'", hold=None)
+
+    @st.fragment
+    def keyboard(self):
+        """Keypress listener in its own fragment, so a key press reruns only this"""
         key = key_press_events()
-        
-        if key:
-            # Reset key press display after 1 second
-            threading.Timer(1.0, self.clear_key_display).start()
-            st.session_state.last_key_press = key.lower()
-            
-            if key.lower() == 'r' and not st.session_state.listening:
-                self.start_listening()
-            elif key.lower() == 's' and st.session_state.listening:
-                self.stop_listening()
-            elif (key == ' ' or key.lower() == 'space') and not st.session_state.listening:
-                # Spacebar handling - both ' ' and 'space' work
-                self.start_listening()
-            elif (key == ' ' or key.lower() == 'space') and st.session_state.listening:
-                # Stop recording on spacebar release if recording
+
+        # The component keeps reporting the last key pressed, so a full page
+        # rerun replays it; only reruns of this fragment are fresh presses
+        fresh = st.session_state.keys_seen_run == st.session_state.page_runs
+        st.session_state.keys_seen_run = st.session_state.page_runs
+        if not key or not fresh:
+            return
+
+        st.session_state.last_key_press = key.lower()
+        st.session_state.key_until = time.time() + KEY_SECONDS
+        if key.lower() == 'r':
+            self.start_listening()
+        elif key.lower() == 's':
+            self.stop_listening()
+        elif key == ' ' or key.lower() == 'space':
+            # Spacebar toggles - both ' ' and 'space' work
+            if self.capture.busy:
                 self.stop_listening()
-            
-            st.rerun()
-    
-    def clear_key_display(self):
-        """Clear the key press display"""
-        st.session_state.last_key_press = None
-        st.rerun()
-    
-    def run_ui(self):
-        """Run Streamlit UI"""
-        # Handle keyboard input
-        self.handle_keyboard()
-        
-        # Mode switch in sidebar
-        with st.sidebar:
-            st.markdown("### ⚙️ Mode Settings")
-            mode_selection = st.radio(
-                "Select Mode:",
-                ["Note Mode", "Assistant Mode"],
-                index=0 if st.session_state.note_mode else 1,
-                help="Note Mode: Direct voice recording | Assistant Mode: Command-based notes"
-            )
-            st.session_state.note_mode = (mode_selection == "Note Mode")
-            
-            st.markdown("---")
-            st.markdown("### 🎮 Keyboard Controls")
-            st.markdown("""
-            **R Key** = Start Recording  
-            **S Key** = Stop Recording  
-            **SPACEBAR** = Toggle Recording (Start/Stop)  
-            **Buttons** = Also work as backup
-            """)
-            
-            # Show last key press
-            if st.session_state.last_key_press:
-                key_display = st.session_state.last_key_press.upper()
-                st.markdown(f"""
-                <div class="keyboard-active">
-                    🎹 Key Pressed: {key_display}
-                </div>
-                """, unsafe_allow_html=True)
-            
-            st.markdown("---")
-            st.markdown("### 📊 Stats")
-            if st.session_state.notes_history:
-                st.success(f"📝 Today's notes: {len(st.session_state.notes_history)}")
             else:
-                st.info("📝 No notes today yet")
-        
-        st.title("🎙️ Listeny - Voice Notes")
-        st.markdown("---")
-        
-        # Mode indicator
-        if st.session_state.note_mode:
-            mode_text = "📝 NOTE MODE (Direct Recording)"
-            mode_class = ""
-        else:
-            mode_text = "🤖 ASSISTANT MODE (Commands)"
-            mode_class = "assistant"
-        
-        st.markdown(f"""
-        <div class="mode-indicator {mode_class}">
-            {mode_text}
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Keyboard hint
-        st.markdown("""
-        <div class="keyboard-hint">
-            ⌨️ KEYBOARD: R=Record | S=Stop | SPACEBAR=Toggle (Start/Stop)
-        </div>
-        """, unsafe_allow_html=True)
-        
+                self.start_listening()
+
+    @st.fragment(run_every=WEB_POLL_SECONDS)
+    def recorder(self):
+        """Record/stop button and status, kept current by polling the capture worker"""
+        self.drain_events()
+        now = time.time()
+
+        # Show last key press
+        if st.session_state.last_key_press and now < st.session_state.key_until:
+            key_display = st.session_state.last_key_press.upper()
+            st.markdown(f"""
+            <div class="keyboard-active">
+                🎹 Key Pressed: {key_display}
+            </div>
+            """, unsafe_allow_html=True)
+
         # Main recording area
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            if st.session_state.listening:
+            if self.capture.busy:
                 # Show STOP button when recording
                 if st.button(
                     "⏹️ STOP RECORDING",
                     key="stop_button",
                     help="Recording in progress - Click to stop",
+                    disabled=self.capture.state != 'recording',
                     use_container_width=True
                 ):
                     self.stop_listening()
@@ -441,21 +430,16 @@ class ListenyKeyboard:
                     use_container_width=True
                 ):
                     self.start_listening()
-        
-        # Auto-refresh when recording
-        if st.session_state.listening:
-            time.sleep(0.8)
-            st.rerun()
-        
+
         # Status display
         st.markdown("### Status")
-        if st.session_state.noted_message:
+        if now < st.session_state.noted_until:
             st.markdown("""
             <div class="noted-message">
                 ✅ NOTED!
             </div>
             """, unsafe_allow_html=True)
-        elif st.session_state.listening:
+        elif self.capture.state == 'recording':
             st.markdown("""
             <div class="listening">
                 <h3>🎙️ RECORDING...</h3>
@@ -467,13 +451,89 @@ class ListenyKeyboard:
                 <p><em>Press 'S' or click STOP button</em></p>
             </div>
             """, unsafe_allow_html=True)
+            st.progress(self.capture.level)
         else:
+            status = "⏳ Transcribing..." if self.capture.state == 'processing' else st.session_state.status
             st.markdown(f"""
             <div class="status-box">
-                {st.session_state.status}
+                {status}
             </div>
             """, unsafe_allow_html=True)
-        
+
+    @st.fragment(run_every=WEB_NOTES_POLL_SECONDS)
+    def notes_panel(self):
+        """Today's notes, picking up new ones from any client within a poll"""
+        day = self.note_store.day_key()
+        content = render_notes(st.session_state.notes_dir, day, self.note_store.version(day))
+        if content:
+            st.caption(f"📊 {self.note_store.count(day)} notes today")
+            st.markdown(content)
+        else:
+            st.info("No notes taken today yet. Press 'R' to start!")
+
+    @st.fragment
+    def manual_note(self):
+        """Typed notes; submitting reruns only this form"""
+        with st.form("manual_note", clear_on_submit=True, border=False):
+            manual_note = st.text_area("Enter your note:", height=100)
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col2:
+                submitted = st.form_submit_button("Add Note Manually", use_container_width=True)
+        if submitted and manual_note.strip():
+            self.note_store.append(manual_note.strip())
+            st.success("✅ Note added!")
+
+    def run_ui(self):
+        """Run Streamlit UI"""
+        st.session_state.page_runs += 1
+
+        # Mode switch in sidebar
+        with st.sidebar:
+            st.markdown("### ⚙️ Mode Settings")
+            mode_selection = st.radio(
+                "Select Mode:",
+                ["Note Mode", "Assistant Mode"],
+                index=0 if st.session_state.note_mode else 1,
+                help="Note Mode: Direct voice recording | Assistant Mode: Command-based notes"
+            )
+            st.session_state.note_mode = (mode_selection == "Note Mode")
+
+            st.markdown("---")
+            st.markdown("### 🎮 Keyboard Controls")
+            st.markdown("""
+            **R Key** = Start Recording  
+            **S Key** = Stop Recording  
+            **SPACEBAR** = Toggle Recording (Start/Stop)  
+            **Buttons** = Also work as backup
+            """)
+
+        st.title("🎙️ Listeny - Voice Notes")
+        st.markdown("---")
+
+        # Mode indicator
+        if st.session_state.note_mode:
+            mode_text = "📝 NOTE MODE (Direct Recording)"
+            mode_class = ""
+        else:
+            mode_text = "🤖 ASSISTANT MODE (Commands)"
+            mode_class = "assistant"
+
+        st.markdown(f"""
+        <div class="mode-indicator {mode_class}">
+            {mode_text}
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Keyboard hint
+        st.markdown("""
+        <div class="keyboard-hint">
+            ⌨️ KEYBOARD: R=Record | S=Stop | SPACEBAR=Toggle (Start/Stop)
+        </div>
+        """, unsafe_allow_html=True)
+
+        self.keyboard()
+        self.recorder()
+
         # Instructions
         st.markdown("---")
         with st.expander("📖 How to Use", expanded=True):
@@ -518,34 +578,13 @@ class ListenyKeyboard:
         
         # Recent notes
         st.markdown("### 📝 Today's Notes")
-        
-        # Load today's notes
-        chicago_tz = ZoneInfo("America/Chicago")
-        today = datetime.now(chicago_tz)
-        filename = today.strftime('%Y-%m-%d') + '.md'
-        filepath = os.path.join(st.session_state.notes_dir, filename)
-        
-        if os.path.exists(filepath):
-            with open(filepath, 'r') as f:
-                content = f.read()
-                st.markdown(content)
-        else:
-            st.info("No notes taken today yet. Press 'R' to start!")
-        
+        self.notes_panel()
+
         # Manual note input
         st.markdown("---")
         st.markdown("### ✍️ Add Note Manually")
-        
-        manual_note = st.text_area("Enter your note:", height=100)
-        col1, col2, col3 = st.columns([1, 1, 1])
-        with col2:
-            if st.button("Add Note Manually", use_container_width=True):
-                if manual_note.strip():
-                    self.save_note(manual_note.strip())
-                    st.success(f"✅ Note added!")
-                    time.sleep(1)
-                    st.rerun()
-        
+        self.manual_note()
+
         # Server info
         st.markdown("---")
         st.markdown("### 🌐 Access Info")